@@ -4,7 +4,9 @@ Evaluation endpoints
 Handles file upload, evaluation, and results retrieval
 """
 
+import asyncio
 import os
+import shutil
 import tempfile
 import time
 from pathlib import Path
@@ -22,6 +24,17 @@ from app.models import EvaluationResponse
 logger = get_logger(__name__)
 router = APIRouter()
 
+# Uploads are copied to disk in fixed-size chunks instead of being buffered whole
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _save_upload(source, file_path: str) -> int:
+    """Copy an upload's spooled file to disk and return the number of bytes written."""
+    source.seek(0)
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(source, buffer, UPLOAD_CHUNK_SIZE)
+        return buffer.tell()
+
 @router.post("/evaluate", response_model=EvaluationResponse)
 async def evaluate_code(
     file: UploadFile = File(...),
@@ -47,13 +60,21 @@ async def evaluate_code(
                 detail=f"File too large. Maximum size is {settings.max_file_size} bytes"
             )
         
+        # Check file type before anything touches the disk
+        file_ext = Path(file.filename).suffix.lower()
+        if file_ext not in settings.allowed_extensions:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file type '{file_ext}'. Allowed types: {', '.join(settings.allowed_extensions)}"
+            )
+        
         # Save uploaded file
         file_path = f"uploads/{uuid.uuid4()}_{file.filename}"
         os.makedirs("uploads", exist_ok=True)
         
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # UploadFile is already spooled (in memory when small, on disk when large), so
+        # copy it in one worker-thread hop instead of awaiting and writing per chunk
+        file_size = await asyncio.to_thread(_save_upload, file.file, file_path)
         
         # Start evaluation
         evaluation_id = await evaluation_service.start_evaluation(
@@ -74,11 +95,13 @@ async def evaluate_code(
         return EvaluationResponse(
             evaluation_id=evaluation_id,
             filename=file.filename,
-            file_size=len(content),
+            file_size=file_size,
             message="File uploaded and evaluation started successfully",
             status="pending"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Evaluation request failed: {e}")
         raise HTTPException(status_code=500, detail=f"Evaluation failed: {str(e)}")
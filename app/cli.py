@@ -25,7 +25,6 @@ from rich.text import Text
 from rich import print as rprint
 
 from app.services.notebook_parser import parser
-from app.services.ai_evaluator import evaluator
 from app.services.evaluation_service import evaluation_service
 
 console = Console()
@@ -38,6 +37,8 @@ class CodeEvaluatorCLI:
         """Initialize CLI with API URL."""
         self.api_url = api_url
         self.api_base = f"{api_url}/api/v1"
+        # One session for all API calls, so status polling reuses the connection
+        self.session = requests.Session()
     
     def evaluate_file(self, file_path: str, output: Optional[str] = None, wait: bool = True) -> Dict[str, Any]:
         """Evaluate a single file."""
@@ -58,7 +59,7 @@ class CodeEvaluatorCLI:
             # Upload file
             with open(file_path, 'rb') as f:
                 files = {'file': (file_path.name, f.read())}
-                response = requests.post(f"{self.api_base}/evaluate", files=files)
+                response = self.session.post(f"{self.api_base}/evaluate", files=files)
             
             if response.status_code != 200:
                 console.print(f"[red]Upload failed: {response.json().get('detail', 'Unknown error')}[/red]")
@@ -89,7 +90,7 @@ class CodeEvaluatorCLI:
             while True:
                 try:
                     # Check status
-                    response = requests.get(f"{self.api_base}/evaluations/{evaluation_id}/status")
+                    response = self.session.get(f"{self.api_base}/evaluations/{evaluation_id}/status")
                     if response.status_code != 200:
                         progress.update(task, description="Failed to get status")
                         return {}
@@ -115,7 +116,7 @@ class CodeEvaluatorCLI:
             
             # Get results
             try:
-                response = requests.get(f"{self.api_base}/evaluations/{evaluation_id}/results")
+                response = self.session.get(f"{self.api_base}/evaluations/{evaluation_id}/results")
                 if response.status_code == 200:
                     results = response.json()
                     
@@ -124,8 +125,7 @@ class CodeEvaluatorCLI:
                     
                     # Save to file if specified
                     if output:
-                        with open(output, 'w') as f:
-                            json.dump(results, f, indent=2, default=str)
+                        self._save_results(results, output)
                         console.print(f"[green]Results saved to: {output}[/green]")
                     
                     return results
@@ -137,6 +137,12 @@ class CodeEvaluatorCLI:
                 console.print(f"[red]Error getting results: {str(e)}[/red]")
                 return {}
     
+    def _save_results(self, results: Dict[str, Any], output: str):
+        """Serialize results once and write them to disk in a single call."""
+        payload = json.dumps(results, indent=2, default=str)
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+    
     def _display_results(self, results: Dict[str, Any]):
         """Display evaluation results in a formatted way."""
         console.print("\n" + "="*80)
@@ -238,7 +244,7 @@ class CodeEvaluatorCLI:
     def list_evaluations(self):
         """List all evaluations."""
         try:
-            response = requests.get(f"{self.api_base}/evaluations")
+            response = self.session.get(f"{self.api_base}/evaluations")
             if response.status_code == 200:
                 evaluations = response.json()
                 
@@ -272,7 +278,7 @@ class CodeEvaluatorCLI:
     def get_status(self, evaluation_id: str):
         """Get evaluation status."""
         try:
-            response = requests.get(f"{self.api_base}/evaluations/{evaluation_id}/status")
+            response = self.session.get(f"{self.api_base}/evaluations/{evaluation_id}/status")
             if response.status_code == 200:
                 status_data = response.json()
                 
@@ -293,7 +299,7 @@ class CodeEvaluatorCLI:
     def get_results(self, evaluation_id: str, output: Optional[str] = None):
         """Get evaluation results."""
         try:
-            response = requests.get(f"{self.api_base}/evaluations/{evaluation_id}/results")
+            response = self.session.get(f"{self.api_base}/evaluations/{evaluation_id}/results")
             if response.status_code == 200:
                 results = response.json()
                 
@@ -302,8 +308,7 @@ class CodeEvaluatorCLI:
                 
                 # Save to file if specified
                 if output:
-                    with open(output, 'w') as f:
-                        json.dump(results, f, indent=2, default=str)
+                    self._save_results(results, output)
                     console.print(f"[green]Results saved to: {output}[/green]")
                 
                 return results
@@ -318,7 +323,7 @@ class CodeEvaluatorCLI:
     def get_statistics(self):
         """Get evaluation statistics."""
         try:
-            response = requests.get(f"{self.api_base}/statistics")
+            response = self.session.get(f"{self.api_base}/statistics")
             if response.status_code == 200:
                 stats = response.json()
                 
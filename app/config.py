@@ -5,6 +5,9 @@ Handles environment variables, logging setup, and production settings
 """
 
 import os
+import atexit
+import functools
+import queue
 import logging
 import logging.handlers
 from pathlib import Path
@@ -53,7 +56,10 @@ class Settings(BaseSettings):
     
     # Evaluation settings
     evaluation_timeout: int = Field(default=300, env="EVALUATION_TIMEOUT")  # 5 minutes
+    model_timeout: int = Field(default=120, env="MODEL_TIMEOUT")  # Per-model limit for one cell
+    skip_trivial_cells: bool = Field(default=True, env="SKIP_TRIVIAL_CELLS")  # No API calls for import-only cells
     max_concurrent_evaluations: int = Field(default=5, env="MAX_CONCURRENT_EVALUATIONS")
+    max_concurrent_cells: int = Field(default=4, env="MAX_CONCURRENT_CELLS")  # Cells evaluated at once across all files of an evaluation
     
     # API settings
     google_api_key: str = Field(default="", env="GOOGLE_API_KEY")
@@ -63,6 +69,18 @@ class Settings(BaseSettings):
     grok_model: str = Field(default="grok-2", env="GROK_MODEL")
     max_tokens: int = Field(default=4000, env="MAX_TOKENS")
     temperature: float = Field(default=0.3, env="TEMPERATURE")
+    ai_batch_size: int = Field(default=8, env="AI_BATCH_SIZE")  # Cells per batched API request
+    ai_batch_max_tokens: int = Field(default=6000, env="AI_BATCH_MAX_TOKENS")  # Estimated code tokens per batched request
+    max_prompt_code_chars: int = Field(default=20000, env="MAX_PROMPT_CODE_CHARS")  # Code sent per cell to API models (0 = no limit)
+    openai_concurrency: int = Field(default=20, env="OPENAI_CONCURRENCY")  # Concurrent OpenAI requests
+    gemini_concurrency: int = Field(default=20, env="GEMINI_CONCURRENCY")  # Concurrent Gemini requests
+    api_max_retries: int = Field(default=3, env="API_MAX_RETRIES")  # Retries for rate-limited/5xx API calls
+    openai_rpm: int = Field(default=0, env="OPENAI_RPM")  # OpenAI requests per minute (0 = unlimited)
+    openai_tpm: int = Field(default=0, env="OPENAI_TPM")  # OpenAI tokens per minute (0 = unlimited)
+    gemini_rpm: int = Field(default=0, env="GEMINI_RPM")  # Gemini requests per minute (0 = unlimited)
+    gemini_tpm: int = Field(default=0, env="GEMINI_TPM")  # Gemini tokens per minute (0 = unlimited)
+    response_cache_policy: str = Field(default="enabled", env="RESPONSE_CACHE_POLICY")  # enabled, read_only, write_only or disabled
+    response_cache_path: str = Field(default="", env="RESPONSE_CACHE_PATH")  # SQLite file keeping API responses across restarts (empty = memory only)
     timeout: int = Field(default=30, env="TIMEOUT")
     redis_db: int = Field(default=0, env="REDIS_DB")
     aws_access_key_id: str = Field(default="", env="AWS_ACCESS_KEY_ID")
@@ -96,6 +114,31 @@ class Settings(BaseSettings):
 # Global settings instance
 settings = Settings()
 
+# Background listener that writes queued log records to the real handlers
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message and traceback formatting to the listener thread."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stdlib prepare() formats the record on the caller's thread so it can be
+        # pickled for other processes; this queue stays in-process, so the record is
+        # enqueued as is and the listener's handlers format it
+        return record
+
+def _stop_log_listener() -> None:
+    """Stop the current log listener (flushing queued records) and close its handlers."""
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    for handler in _log_listener.handlers:
+        handler.close()
+    _log_listener = None
+
+# Registered once; stops whichever listener is current at exit
+atexit.register(_stop_log_listener)
+
 def setup_logging() -> None:
     """Setup application logging with rotation and formatting."""
     
@@ -117,13 +160,14 @@ def setup_logging() -> None:
     root_logger.setLevel(log_level)
     
     # Clear existing handlers
+    global _log_listener
+    _stop_log_listener()
     root_logger.handlers.clear()
     
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(log_level)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
     
     # File handler with rotation
     file_handler = logging.handlers.RotatingFileHandler(
@@ -133,7 +177,15 @@ def setup_logging() -> None:
     )
     file_handler.setLevel(log_level)
     file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
+    
+    # Callers only enqueue records; formatting (including tracebacks) and
+    # console/file I/O happen on the listener thread, off the request path
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(_DeferredQueueHandler(log_queue))
+    _log_listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _log_listener.start()
     
     # Set specific logger levels
     logging.getLogger("uvicorn").setLevel(logging.INFO)
@@ -144,12 +196,17 @@ def setup_logging() -> None:
     logger = logging.getLogger(__name__)
     logger.info(f"Logging configured - Level: {settings.log_level}, File: {settings.log_file}")
 
+@functools.lru_cache(maxsize=None)
 def get_logger(name: str) -> logging.Logger:
     """Get a logger instance with the given name."""
     return logging.getLogger(name)
 
+@functools.lru_cache(maxsize=None)
 def validate_settings() -> None:
-    """Validate critical settings and create necessary directories."""
+    """Validate critical settings and create necessary directories.
+    
+    Cached, so repeated calls after a successful validation are no-ops.
+    """
     
     # Create upload directory
     upload_path = Path(settings.upload_dir)
@@ -167,6 +224,10 @@ def validate_settings() -> None:
     if settings.max_concurrent_evaluations <= 0:
         raise ValueError("MAX_CONCURRENT_EVALUATIONS must be positive")
     
+    # Validate response cache policy
+    if settings.response_cache_policy not in ("enabled", "read_only", "write_only", "disabled"):
+        raise ValueError("RESPONSE_CACHE_POLICY must be enabled, read_only, write_only or disabled")
+    
     logger = get_logger(__name__)
     logger.info(f"Settings validated - Upload dir: {upload_path}, Max file size: {settings.max_file_size}")
 
@@ -17,6 +17,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import base64
+import io
 from datetime import datetime
 from typing import Dict, List, Optional
 
@@ -39,6 +40,12 @@ st.set_page_config(
 # API configuration
 API_BASE_URL = "http://localhost:8000/api/v1"
 
+
+@st.cache_resource
+def get_api_session() -> requests.Session:
+    """Shared HTTP session, so reruns and status polling reuse keep-alive connections."""
+    return requests.Session()
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -299,7 +306,7 @@ def start_evaluation_with_file(uploaded_file):
                 data["grok_api_key"] = st.session_state.grok_api_key
             
             # Make the API request
-            response = requests.post(
+            response = get_api_session().post(
                 f"{API_BASE_URL}/evaluate",
                 files=files,
                 data=data,
@@ -359,63 +366,49 @@ def start_evaluation_with_sql_code(sql_code):
 
     with st.spinner("Evaluating SQL code..."):
         try:
-            # Create a temporary file with the SQL code
-            import tempfile
-            import os
+            # Upload the SQL code straight from memory
+            files = {"file": ("sql_code.sql", io.BytesIO(sql_code.encode("utf-8")), "text/plain")}
+            data = {
+                "use_codebert": st.session_state.use_codebert,
+                "use_sqlcoder": st.session_state.use_sqlcoder,
+                "use_openai": st.session_state.use_openai,
+                "use_gemini": st.session_state.use_gemini,
+                "use_grok": st.session_state.use_grok
+            }
             
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.sql', delete=False) as temp_file:
-                temp_file.write(sql_code)
-                temp_file_path = temp_file.name
+            # Add API keys if provided
+            if st.session_state.openai_api_key:
+                data["openai_api_key"] = st.session_state.openai_api_key
+            if st.session_state.google_api_key:
+                data["google_api_key"] = st.session_state.google_api_key
+            if st.session_state.grok_api_key:
+                data["grok_api_key"] = st.session_state.grok_api_key
             
-            try:
-                # Prepare the evaluation request
-                with open(temp_file_path, 'rb') as f:
-                    files = {"file": ("sql_code.sql", f, "text/plain")}
-                    data = {
-                        "use_codebert": st.session_state.use_codebert,
-                        "use_sqlcoder": st.session_state.use_sqlcoder,
-                        "use_openai": st.session_state.use_openai,
-                        "use_gemini": st.session_state.use_gemini,
-                        "use_grok": st.session_state.use_grok
-                    }
-                    
-                    # Add API keys if provided
-                    if st.session_state.openai_api_key:
-                        data["openai_api_key"] = st.session_state.openai_api_key
-                    if st.session_state.google_api_key:
-                        data["google_api_key"] = st.session_state.google_api_key
-                    if st.session_state.grok_api_key:
-                        data["grok_api_key"] = st.session_state.grok_api_key
-                    
-                    # Make the API request
-                    response = requests.post(
-                        f"{API_BASE_URL}/evaluate",
-                        files=files,
-                        data=data,
-                        timeout=30
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        evaluation_id = result["evaluation_id"]
-                        
-                        st.success(f"✅ Evaluation started successfully!")
-                        st.info(f"**Evaluation ID:** {evaluation_id}")
-                        
-                        # Store evaluation ID in session state
-                        st.session_state.current_evaluation_id = evaluation_id
-                        st.session_state.evaluation_status = "pending"
-                        
-                        # Start progress monitoring
-                        st.subheader("📊 Evaluation Progress")
-                        progress_monitor(evaluation_id)
-                        
-                    else:
-                        st.error(f"❌ Failed to start evaluation: {response.text}")
-                        
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
+            # Make the API request
+            response = get_api_session().post(
+                f"{API_BASE_URL}/evaluate",
+                files=files,
+                data=data,
+                timeout=30
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                evaluation_id = result["evaluation_id"]
+                
+                st.success(f"✅ Evaluation started successfully!")
+                st.info(f"**Evaluation ID:** {evaluation_id}")
+                
+                # Store evaluation ID in session state
+                st.session_state.current_evaluation_id = evaluation_id
+                st.session_state.evaluation_status = "pending"
+                
+                # Start progress monitoring
+                st.subheader("📊 Evaluation Progress")
+                progress_monitor(evaluation_id)
+                
+            else:
+                st.error(f"❌ Failed to start evaluation: {response.text}")
                 
         except requests.exceptions.RequestException as e:
             st.error(f"❌ Connection error: {e}")
@@ -446,7 +439,7 @@ def progress_monitor(evaluation_id: str):
     
     while True:
         try:
-            response = requests.get(f"{API_BASE_URL}/evaluations/{evaluation_id}/status")
+            response = get_api_session().get(f"{API_BASE_URL}/evaluations/{evaluation_id}/status")
             if response.status_code == 200:
                 status_data = response.json()
                 
@@ -532,7 +525,7 @@ def progress_monitor(evaluation_id: str):
 def show_recent_evaluations():
     """Show recent evaluations."""
     try:
-        response = requests.get(f"{API_BASE_URL}/evaluations")
+        response = get_api_session().get(f"{API_BASE_URL}/evaluations")
         if response.status_code == 200:
             evaluations = response.json()
             
@@ -651,7 +644,7 @@ def results_page():
 def load_evaluation_results(evaluation_id: str):
     """Load and display evaluation results."""
     try:
-        response = requests.get(f"{API_BASE_URL}/evaluations/{evaluation_id}/results")
+        response = get_api_session().get(f"{API_BASE_URL}/evaluations/{evaluation_id}/results")
         if response.status_code == 200:
             results = response.json()
             display_evaluation_results(results)
@@ -981,7 +974,7 @@ def statistics_page():
     st.header("📈 Statistics")
     
     try:
-        response = requests.get(f"{API_BASE_URL}/statistics")
+        response = get_api_session().get(f"{API_BASE_URL}/statistics")
         if response.status_code == 200:
             stats = response.json()
             display_statistics(stats)
@@ -6,8 +6,8 @@ Production-ready API server with comprehensive logging and error handling
 
 import os
 import sys
+import logging
 import time
-import traceback
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -15,13 +15,13 @@ import uvicorn
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 import redis.asyncio as redis
 
 from app.config import settings, get_logger, validate_settings
 from app.api.v1.api import api_router
-from app.services.evaluation_service import EvaluationService
+from app.services.evaluation_service import evaluation_service
 
 # Setup logging
 logger = get_logger(__name__)
@@ -62,9 +62,9 @@ async def lifespan(app: FastAPI):
     
     # Initialize evaluation service
     try:
-        # EvaluationService.initialize(redis_client)
-        # logger.info("Evaluation service initialized successfully")
-        pass  # Placeholder for future initialization
+        # Share the service instance used by the API routes
+        app.state.evaluation_service = evaluation_service
+        logger.info("Evaluation service initialized successfully")
     except Exception as e:
         logger.error(f"Evaluation service initialization failed: {e}")
         sys.exit(1)
@@ -88,6 +88,7 @@ app = FastAPI(
     description="AI-powered code evaluation system with comprehensive analysis",
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -114,15 +115,21 @@ async def log_requests(request: Request, call_next):
     """Log all incoming requests and their processing time."""
     start_time = time.time()
     
-    # Log request
-    logger.info(f"Request: {request.method} {request.url.path} - Client: {request.client.host if request.client else 'unknown'}")
+    # Read path straight from the ASGI scope rather than building request.url
+    path = request.scope["path"]
     
     try:
         response = await call_next(request)
         
-        # Log response
+        # Log request and response as a single record (formatted lazily by logging)
         process_time = time.time() - start_time
-        logger.info(f"Response: {response.status_code} - Process time: {process_time:.3f}s")
+        if logger.isEnabledFor(logging.INFO):
+            client = request.scope.get("client")
+            logger.info(
+                "Request: %s %s - Client: %s - Response: %s - Process time: %.3fs",
+                request.method, path, client[0] if client else 'unknown',
+                response.status_code, process_time
+            )
         
         # Add process time header
         response.headers["X-Process-Time"] = str(process_time)
@@ -132,40 +139,52 @@ async def log_requests(request: Request, call_next):
     except Exception as e:
         # Log error
         process_time = time.time() - start_time
-        logger.error(f"Request failed: {request.method} {request.url.path} - Error: {e} - Process time: {process_time:.3f}s")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        # The traceback is formatted on the log listener thread, not in the request
+        logger.error(
+            "Request failed: %s %s - Error: %s - Process time: %.3fs",
+            request.method, path, e, process_time, exc_info=True
+        )
         raise
 
+# Error payload templates; handlers copy them and fill in per-request fields
+_INTERNAL_ERROR_TEMPLATE = {
+    "error": "Internal server error",
+    "message": "An unexpected error occurred. Please try again later.",
+    "request_id": None
+}
+_HTTP_ERROR_TEMPLATE = {
+    "error": "HTTP error",
+    "message": None,
+    "status_code": None,
+    "request_id": None
+}
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler for unhandled errors."""
-    logger.error(f"Unhandled exception: {exc}")
+    logger.error(f"Unhandled exception: {exc}", exc_info=exc)
     logger.error(f"Request: {request.method} {request.url.path}")
-    logger.error(f"Traceback: {traceback.format_exc()}")
     
-    return JSONResponse(
+    content = _INTERNAL_ERROR_TEMPLATE.copy()
+    content["request_id"] = getattr(request.state, 'request_id', 'unknown')
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={
-            "error": "Internal server error",
-            "message": "An unexpected error occurred. Please try again later.",
-            "request_id": getattr(request.state, 'request_id', 'unknown')
-        }
+        content=content
     )
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Handle HTTP exceptions with proper logging."""
-    logger.warning(f"HTTP exception: {exc.status_code} - {exc.detail}")
-    logger.warning(f"Request: {request.method} {request.url.path}")
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(f"HTTP exception: {exc.status_code} - {exc.detail} - Request: {request.method} {request.url.path}")
     
-    return JSONResponse(
+    content = _HTTP_ERROR_TEMPLATE.copy()
+    content["message"] = exc.detail
+    content["status_code"] = exc.status_code
+    content["request_id"] = getattr(request.state, 'request_id', 'unknown')
+    return ORJSONResponse(
         status_code=exc.status_code,
-        content={
-            "error": "HTTP error",
-            "message": exc.detail,
-            "status_code": exc.status_code,
-            "request_id": getattr(request.state, 'request_id', 'unknown')
-        }
+        content=content
     )
 
 @app.get("/")
@@ -215,12 +234,12 @@ async def health_check():
     return health_status
 
 @app.get("/metrics")
-async def metrics():
+async def metrics(request: Request):
     """Basic metrics endpoint for monitoring."""
-    evaluation_service = EvaluationService()
+    service = request.app.state.evaluation_service
     return {
-        "evaluations_total": evaluation_service.get_total_evaluations(),
-        "evaluations_in_progress": evaluation_service.get_in_progress_count(),
+        "evaluations_total": service.get_total_evaluations(),
+        "evaluations_in_progress": service.get_in_progress_count(),
         "uptime": time.time() - getattr(app.state, 'start_time', time.time()),
         "version": settings.app_version
     }
@@ -3,10 +3,12 @@ Data models for the AI Code Evaluator application.
 """
 
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Any, Tuple
+from pydantic import BaseModel, ConfigDict, Field
 from enum import Enum
 
+import numpy as np
+
 
 class LanguageType(str, Enum):
     """Supported programming languages."""
@@ -26,6 +28,10 @@ class EvaluationStatus(str, Enum):
 
 class ScoreBreakdown(BaseModel):
     """Individual score breakdown for each criterion."""
+    # Score breakdowns are never mutated after scoring, so instances can be
+    # shared between cells, files and cached results without copying
+    model_config = ConfigDict(frozen=True)
+    
     correctness: float = Field(..., ge=0, le=10, description="Code logic and syntax accuracy")
     efficiency: float = Field(..., ge=0, le=10, description="Performance and resource usage")
     readability: float = Field(..., ge=0, le=10, description="Code clarity and structure")
@@ -35,18 +41,30 @@ class ScoreBreakdown(BaseModel):
     documentation: float = Field(..., ge=0, le=10, description="Comments and documentation quality")
     best_practices: float = Field(..., ge=0, le=10, description="Industry standards compliance")
     error_handling: float = Field(..., ge=0, le=10, description="Robustness and error management")
+    
+    def as_array(self) -> np.ndarray:
+        """Return the scores as a float64 vector in SCORE_CRITERIA order."""
+        return np.fromiter(
+            (getattr(self, criterion) for criterion in SCORE_CRITERIA),
+            dtype=np.float64,
+            count=len(SCORE_CRITERIA)
+        )
+
+
+# Score criteria in ScoreBreakdown field order (columns of score vectors and matrices)
+SCORE_CRITERIA = tuple(ScoreBreakdown.model_fields)
 
 
 class ModelFeedback(BaseModel):
     """Feedback from a specific AI model."""
     model_name: str
     feedback: str
-    suggestions: List[str]
+    suggestions: Tuple[str, ...]
     confidence: float = Field(..., ge=0, le=1)
     scores: Optional[ScoreBreakdown] = None
     
-    class Config:
-        protected_namespaces = ()
+    # Immutable like ScoreBreakdown, so cached feedback is shared instead of deep-copied
+    model_config = ConfigDict(frozen=True, protected_namespaces=())
 
 
 class CodeCell(BaseModel):
@@ -5,53 +5,322 @@ Handles code evaluation using multiple AI models (OpenAI GPT-4, Google Gemini, a
 """
 
 import asyncio
-import json
+import hashlib
 import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+import numpy as np
 import openai
+import orjson
 import google.generativeai as genai
+import httpx
+import jiter
 import requests
+from pydantic import ValidationError
 
 from app.config import settings
 from app.models import (
     ScoreBreakdown, 
     ModelFeedback, 
     LanguageType,
-    CodeCell
+    CodeCell,
+    SCORE_CRITERIA
 )
-from app.services.codebert_evaluator import CodeBERTEvaluator
-from app.services.enhanced_evaluator import EnhancedEvaluator
-from app.services.sqlcoder_evaluator import SQLCoderEvaluator
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of API model responses kept in memory (keyed by model and code hash)
+RESPONSE_CACHE_SIZE = 4096
+
+# Response parsing: outermost JSON object, markdown fences / escaped control
+# characters stripped on retry, and "N out of 10"-style scores for the text fallback
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+_JSON_NOISE_RE = re.compile(r'```(?:json)?|\\[ntr]')
+_JSON_WHITESPACE_TABLE = str.maketrans('\n\r\t', '   ')
+_TEXT_SCORE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:out of\s*10|/10|score)', re.IGNORECASE)
+
+# Lines that make a cell trivial: imports, comments and blank lines
+_IMPORT_OR_COMMENT_LINE_RE = re.compile(r'\s*(?:(?:import|from)\s|#|$)')
+
+# Issue keywords looked for in lowercased model feedback (substring matches, as before)
+_ISSUE_KEYWORD_RE = re.compile(r'error|security|vulnerability|performance')
+
+# OpenAI errors worth retrying with backoff (rate limits, 5xx, dropped connections)
+_OPENAI_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError
+)
+
+# Placeholders in the evaluation prompt template
+PROMPT_LANGUAGE_PLACEHOLDER = "__LANGUAGE__"
+PROMPT_CODE_PLACEHOLDER = "__CODE__"
+
+# Response format for batched prompts, split around the cell count
+BATCH_RESPONSE_FORMAT_HEAD = '\nRESPONSE FORMAT: a JSON object {"cells": [...]} whose array holds exactly '
+BATCH_RESPONSE_FORMAT_TAIL = (
+    ' objects, one per cell in order. Each object has the keys "cell" (the cell number), "scores" '
+    '(the nine criteria above, numbers 1-10), "feedback", "suggestions" and "confidence" (0-1).\n'
+    'CRITICAL: Respond with ONLY that JSON object. No markdown, no code blocks, no extra text.'
+)
+
+# Model used for Grok-style evaluation through the Anthropic API
+GROK_MODEL = "claude-3-5-sonnet-20241022"
+
+# Display names used in logs and error feedback, keyed like the result dict
+MODEL_DISPLAY_NAMES = {
+    'enhanced': 'enhanced',
+    'sqlcoder': 'sqlcoder',
+    'openai': 'OpenAI GPT-4',
+    'gemini': 'Google Gemini',
+    'grok': 'Grok'
+}
+
+
+def _coerce_number(value) -> float:
+    """Convert a numeric or numeric-string response value to float, NaN if it is neither."""
+    if isinstance(value, (int, float, str)):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return float('nan')
+
+
+def _is_import_only(code: str) -> bool:
+    """True if every line of the cell is an import, a comment or blank."""
+    return all(_IMPORT_OR_COMMENT_LINE_RE.match(line) for line in code.splitlines())
+
+
+class _AsyncTokenBucket:
+    """Paces API requests against per-minute request and token limits (0 disables a limit)."""
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self._rpm = requests_per_minute
+        self._tpm = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request and ``tokens`` tokens are available, then take them."""
+        if self._rpm <= 0 and self._tpm <= 0:
+            return
+        if self._tpm > 0:
+            # A single request larger than the whole budget waits for a full bucket
+            tokens = min(tokens, self._tpm)
+        
+        # Waiters queue on the lock, so requests are released in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._updated = now
+                if self._rpm > 0:
+                    self._requests = min(self._rpm, self._requests + elapsed * self._rpm / 60.0)
+                if self._tpm > 0:
+                    self._tokens = min(self._tpm, self._tokens + elapsed * self._tpm / 60.0)
+                
+                wait = 0.0
+                if self._rpm > 0 and self._requests < 1:
+                    wait = (1 - self._requests) * 60.0 / self._rpm
+                if self._tpm > 0 and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60.0 / self._tpm)
+                if wait <= 0:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep(wait)
+
+
+class _JsonObjectStream:
+    """Collects streamed response text and detects when its first JSON value closes.
+    
+    The value is the first object or array; batched replies may be a bare array
+    of per-cell objects, so arrays count towards the depth as well.
+    """
+    
+    __slots__ = ('_chunks', '_depth', '_in_string', '_escaped')
+    
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, text: str) -> bool:
+        """Add a chunk; return True once the outermost object or array has been closed."""
+        self._chunks.append(text)
+        for char in text:
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                # Quotes only delimit strings inside the object, not in leading prose
+                self._in_string = self._depth > 0
+            elif char == '{' or char == '[':
+                self._depth += 1
+            elif (char == '}' or char == ']') and self._depth:
+                self._depth -= 1
+                if not self._depth:
+                    return True
+        return False
+    
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
 
 class AIEvaluator:
     """AI-powered code evaluator using multiple models."""
     
+    # Shared scores and suggestions for failed evaluations; ScoreBreakdown is
+    # frozen and the suggestions are tuples, so sharing them is safe
+    _ZERO_SCORES = ScoreBreakdown(**dict.fromkeys(SCORE_CRITERIA, 0.0))
+    _DEFAULT_SCORES = ScoreBreakdown(**dict.fromkeys(SCORE_CRITERIA, 5.0))
+    _QUOTA_ERROR_SUGGESTIONS = (
+        "Upgrade your API plan to increase quota limits",
+        "Wait for quota reset and try again later",
+        "Use local models (Enhanced Evaluator) as fallback",
+        "Contact API provider for quota increase"
+    )
+    _AUTH_ERROR_SUGGESTIONS = (
+        "Check your API key configuration",
+        "Verify API key is valid and active",
+        "Ensure API key has proper permissions",
+        "Use local models as alternative"
+    )
+    _DEFAULT_ERROR_SUGGESTIONS = (
+        "Try using local models (Enhanced Evaluator)",
+        "Check your internet connection",
+        "Verify API service is available",
+        "Contact support if issue persists"
+    )
+    
     def __init__(self):
         """Initialize AI evaluator with API clients."""
-        # Configure OpenAI API key for v0.x SDK
-        openai.api_key = settings.openai_api_key
-        genai.configure(api_key=settings.google_api_key)
-        self.gemini_model = genai.GenerativeModel(settings.gemini_model)
-        
-        # Initialize evaluators
-        self.codebert_evaluator = CodeBERTEvaluator()
-        self.enhanced_evaluator = EnhancedEvaluator()
-        # Use singleton for SQLCoderEvaluator
-        from app.services.sqlcoder_evaluator import SQLCoderEvaluator
-        self.sqlcoder_evaluator = SQLCoderEvaluator()
+        # API clients are created per API key on first use and then reused,
+        # so their HTTP connection pools survive across evaluations
+        self._openai_clients: Dict[str, openai.AsyncOpenAI] = {}
+        # All OpenAI clients share one keep-alive connection pool, sized to the
+        # concurrency cap so every in-flight request can reuse a warm connection
+        self._openai_http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.openai_concurrency,
+                max_keepalive_connections=settings.openai_concurrency
+            ),
+            timeout=httpx.Timeout(settings.model_timeout, connect=10.0),
+            follow_redirects=True
+        )
+        self._gemini_models: Dict[str, genai.GenerativeModel] = {}
+        self._grok_clients: Dict[str, object] = {}
+        # Grok clients get their own httpx client too; Anthropic SDK releases that build
+        # one themselves pass the removed ``proxies`` argument on httpx>=0.28
+        self._grok_http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.model_timeout, connect=10.0),
+            follow_redirects=True
+        )
+        # Models that rejected structured JSON output
+        self._json_mode_unsupported: set = set()
+        
+        # Per-provider caps on in-flight requests, so notebook-wide fan-out stays
+        # under the providers' rate limits instead of bursting into 429s
+        self._openai_semaphore = asyncio.Semaphore(settings.openai_concurrency)
+        self._gemini_semaphore = asyncio.Semaphore(settings.gemini_concurrency)
+        # Proactive pacing against the providers' per-minute quotas, so requests
+        # wait locally instead of round-tripping into a 429
+        self._openai_bucket = _AsyncTokenBucket(settings.openai_rpm, settings.openai_tpm)
+        self._gemini_bucket = _AsyncTokenBucket(settings.gemini_rpm, settings.gemini_tpm)
+        
+        # Identical cells (re-runs, duplicated boilerplate) reuse API responses
+        self._response_cache: "OrderedDict[str, ModelFeedback]" = OrderedDict()
+        # Optionally backed by SQLite, so re-grading after a restart is served locally too
+        self._response_store = self._open_response_store(settings.response_cache_path)
+        # Store reads and writes run on one thread that owns the connection, off the event loop
+        self._store_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-store")
+        self._store_commit_pending = False
+        
+        # Local evaluators are synchronous and CPU-bound; they share one bounded
+        # pool so they overlap with API requests without oversubscribing the CPU
+        self._cpu_pool = ThreadPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1),
+            thread_name_prefix="local-evaluator"
+        )
+        
+        # Local evaluators load their models on first use (see the properties below),
+        # so API-only evaluations never import torch/transformers models
+        self._codebert_evaluator = None
+        self._enhanced_evaluator = None
+        self._sqlcoder_evaluator = None
+        self._local_evaluator_lock = threading.Lock()
         
         logger.info("AI Evaluator initialized with CodeBERT, Enhanced Task-Specific Evaluator, SQLCoder, and Grok support")
         
         # Evaluation criteria and weights
         self.criteria = settings.evaluation_criteria
         
-        # Evaluation prompts
+        # Evaluation prompts; the template is split around its placeholders once and
+        # specialized per language, so each prompt is a plain join around the code
+        # (the template's JSON braces rule out str.format)
         self.evaluation_prompt = self._create_evaluation_prompt()
+        prefix, rest = self.evaluation_prompt.split(PROMPT_LANGUAGE_PLACEHOLDER)
+        middle, suffix = rest.split(PROMPT_CODE_PLACEHOLDER)
+        self._prompt_parts = {
+            language: (prefix + language.value + middle, suffix) for language in LanguageType
+        }
+        # Batched prompts share the criteria and instructions, with their own response format;
+        # only the cells and the cell count vary per request
+        self._batch_prompt_header = (
+            self.evaluation_prompt.split("RESPONSE FORMAT")[0] + "CODE CELLS TO EVALUATE:\n"
+        )
+        # Part of every response cache key, so persisted responses to an older prompt are not reused
+        self._prompt_fingerprint = hashlib.blake2b(
+            self.evaluation_prompt.encode('utf-8'), digest_size=8
+        ).hexdigest()
+    
+    @property
+    def codebert_evaluator(self):
+        """CodeBERT evaluator, created on first use."""
+        if self._codebert_evaluator is None:
+            with self._local_evaluator_lock:
+                if self._codebert_evaluator is None:
+                    from app.services.codebert_evaluator import CodeBERTEvaluator
+                    self._codebert_evaluator = CodeBERTEvaluator()
+        return self._codebert_evaluator
+    
+    @property
+    def enhanced_evaluator(self):
+        """Enhanced task-specific evaluator, created on first use."""
+        if self._enhanced_evaluator is None:
+            with self._local_evaluator_lock:
+                if self._enhanced_evaluator is None:
+                    from app.services.enhanced_evaluator import EnhancedEvaluator
+                    self._enhanced_evaluator = EnhancedEvaluator()
+        return self._enhanced_evaluator
+    
+    @property
+    def sqlcoder_evaluator(self):
+        """SQLCoder evaluator (a process-wide singleton), created on first use."""
+        if self._sqlcoder_evaluator is None:
+            with self._local_evaluator_lock:
+                if self._sqlcoder_evaluator is None:
+                    from app.services.sqlcoder_evaluator import SQLCoderEvaluator
+                    self._sqlcoder_evaluator = SQLCoderEvaluator()
+        return self._sqlcoder_evaluator
     
     def _create_evaluation_prompt(self) -> str:
         """Create the evaluation prompt for AI models."""
@@ -148,13 +417,25 @@ RESPONSE FORMAT (JSON only):
 }
 
 CODE TO EVALUATE:
-Language: {language}
+Language: __LANGUAGE__
 Code:
-{code}
+__CODE__
 
-CRITICAL: Respond with ONLY valid JSON. No markdown, no code blocks, no extra text. Start with {{ and end with }}. All scores must be numbers 1-10. Do not include any formatting characters like \\n or \\t in the JSON.
+CRITICAL: Respond with ONLY valid JSON. No markdown, no code blocks, no extra text. Start with { and end with }. All scores must be numbers 1-10. Do not include any formatting characters like \\n or \\t in the JSON.
 """
     
+    def _build_prompt(self, cell: CodeCell) -> str:
+        """Fill the evaluation prompt with a cell's language and code."""
+        head, suffix = self._prompt_parts[cell.language]
+        return "".join((head, self._prompt_code(cell), suffix))
+    
+    def _prompt_code(self, cell: CodeCell) -> str:
+        """Return the cell's code for a prompt, cut off at max_prompt_code_chars."""
+        limit = settings.max_prompt_code_chars
+        if limit <= 0 or len(cell.code) <= limit:
+            return cell.code
+        return cell.code[:limit] + "\n# ... (truncated)"
+    
     async def evaluate_code_cell(
         self, 
         cell: CodeCell, 
@@ -165,204 +446,425 @@ CRITICAL: Respond with ONLY valid JSON. No markdown, no code blocks, no extra te
         use_sqlcoder: bool = False,
         use_openai: bool = False,
         use_gemini: bool = False,
-        use_grok: bool = False
+        use_grok: bool = False,
+        prefetched: Optional[Dict[str, ModelFeedback]] = None
     ) -> Dict[str, ModelFeedback]:
-        """Evaluate a code cell using selected AI models with parallel execution."""
-        import threading
-        import time
-        import asyncio
+        """Evaluate a code cell using selected AI models with parallel execution.
         
+        ``prefetched`` holds feedback already produced for this cell (e.g. by
+        evaluate_code_cells_batch); those models are not called again.
+        """
+        prefetched = prefetched or {}
         start_time = time.time()
         logger.info(f"Starting parallel evaluation with models: CodeBERT={use_codebert}, SQLCoder={use_sqlcoder}, OpenAI={use_openai}, Gemini={use_gemini}, Grok={use_grok}")
         
-        # Thread-safe dictionary for results
-        model_scores = {}
+        # Import-only cells give an API reviewer nothing to judge; when a local
+        # evaluator scores the cell anyway, the API models are not called
+        if self._skip_api_models(cell, use_codebert, use_sqlcoder):
+            logger.info(f"Cell {cell.cell_id} only contains imports; skipping API models")
+            use_openai = use_gemini = use_grok = False
         
-        # Define evaluation functions for threading
-        def run_enhanced_evaluation():
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                result = loop.run_until_complete(self._evaluate_with_enhanced(cell))
-                model_scores['enhanced'] = result
-                logger.info("Enhanced evaluation completed")
-            except Exception as e:
-                logger.error(f"Enhanced evaluation error: {e}")
-                model_scores['enhanced'] = self._create_error_feedback('enhanced', str(e))
-        
-        def run_sqlcoder_evaluation():
-            try:
-                # Lazy load SQLCoderEvaluator only when needed
-                sqlcoder_evaluator = SQLCoderEvaluator()
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                result = loop.run_until_complete(sqlcoder_evaluator.evaluate(cell))
-                model_scores['sqlcoder'] = result
-                del sqlcoder_evaluator  # Release memory
-                logger.info("SQLCoder evaluation completed")
-            except Exception as e:
-                logger.error(f"SQLCoder evaluation error: {e}")
-                model_scores['sqlcoder'] = self._create_error_feedback('sqlcoder', str(e))
-        
-        def run_openai_evaluation():
-            try:
-                if not openai_api_key:
-                    model_scores['openai'] = self._create_error_feedback('OpenAI GPT-4', "No API key provided")
-                    return
-                
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                result = loop.run_until_complete(self._evaluate_with_openai(cell, openai_api_key))
-                model_scores['openai'] = result
-                logger.info("OpenAI evaluation completed")
-            except Exception as e:
-                logger.error(f"OpenAI evaluation error: {e}")
-                model_scores['openai'] = self._create_error_feedback('OpenAI GPT-4', str(e))
-        
-        def run_gemini_evaluation():
-            try:
-                if not google_api_key:
-                    model_scores['gemini'] = self._create_error_feedback('Google Gemini', "No API key provided")
-                    return
-                
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                result = loop.run_until_complete(self._evaluate_with_gemini(cell, google_api_key))
-                model_scores['gemini'] = result
-                logger.info("Gemini evaluation completed")
-            except Exception as e:
-                logger.error(f"Gemini evaluation error: {e}")
-                model_scores['gemini'] = self._create_error_feedback('Google Gemini', str(e))
-        
-        def run_grok_evaluation():
-            try:
-                if not grok_api_key:
-                    model_scores['grok'] = self._create_error_feedback('Grok', "No API key provided")
-                    return
-                
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                result = loop.run_until_complete(self._evaluate_with_grok(cell, grok_api_key))
-                model_scores['grok'] = result
-                logger.info("Grok evaluation completed")
-            except Exception as e:
-                logger.error(f"Grok evaluation error: {e}")
-                model_scores['grok'] = self._create_error_feedback('Grok', str(e))
-        
-        # Start evaluation threads based on selected models
-        threads = []
+        # API models share one prompt per cell instead of each building its own copy
+        needs_prompt = (
+            (use_openai and openai_api_key and 'openai' not in prefetched)
+            or (use_gemini and google_api_key and 'gemini' not in prefetched)
+            or (use_grok and grok_api_key)
+        )
+        prompt = self._build_prompt(cell) if needs_prompt else None
         
+        # One coroutine per selected model, run concurrently on the current event loop
+        tasks = {}
         if use_codebert:
-            thread = threading.Thread(target=run_enhanced_evaluation)
-            threads.append(thread)
-            thread.start()
-        
+            tasks['enhanced'] = self._evaluate_with_enhanced(cell)
         if use_sqlcoder:
-            thread = threading.Thread(target=run_sqlcoder_evaluation)
-            threads.append(thread)
-            thread.start()
-        
-        if use_openai:
-            thread = threading.Thread(target=run_openai_evaluation)
-            threads.append(thread)
-            thread.start()
-        
-        if use_gemini:
-            thread = threading.Thread(target=run_gemini_evaluation)
-            threads.append(thread)
-            thread.start()
-        
+            tasks['sqlcoder'] = self._evaluate_with_sqlcoder(cell)
+        if use_openai and 'openai' not in prefetched:
+            tasks['openai'] = (
+                self._evaluate_with_openai(cell, prompt, openai_api_key) if openai_api_key
+                else self._missing_api_key_feedback('openai')
+            )
+        if use_gemini and 'gemini' not in prefetched:
+            tasks['gemini'] = (
+                self._evaluate_with_gemini(cell, prompt, google_api_key) if google_api_key
+                else self._missing_api_key_feedback('gemini')
+            )
         if use_grok:
-            thread = threading.Thread(target=run_grok_evaluation)
-            threads.append(thread)
-            thread.start()
+            tasks['grok'] = (
+                self._evaluate_with_grok(cell, prompt, grok_api_key) if grok_api_key
+                else self._missing_api_key_feedback('grok')
+            )
         
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
+        # A per-model timeout keeps one slow provider from holding up the whole cell
+        results = dict(zip(tasks, await asyncio.gather(
+            *(asyncio.wait_for(task, timeout=settings.model_timeout) for task in tasks.values()),
+            return_exceptions=True
+        )))
+        
+        # Assemble results in a fixed model order, whether prefetched or just evaluated
+        model_scores = {}
+        for key in MODEL_DISPLAY_NAMES:
+            if key in results:
+                result = results[key]
+                if isinstance(result, asyncio.TimeoutError):
+                    logger.error(f"{MODEL_DISPLAY_NAMES[key]} evaluation timed out after {settings.model_timeout}s")
+                    model_scores[key] = self._create_error_feedback(
+                        MODEL_DISPLAY_NAMES[key], f"Evaluation timed out after {settings.model_timeout} seconds"
+                    )
+                elif isinstance(result, Exception):
+                    logger.error(f"{MODEL_DISPLAY_NAMES[key]} evaluation error: {result}")
+                    model_scores[key] = self._create_error_feedback(MODEL_DISPLAY_NAMES[key], str(result))
+                else:
+                    logger.info(f"{MODEL_DISPLAY_NAMES[key]} evaluation completed")
+                    model_scores[key] = result
+            elif key in prefetched and (
+                (key == 'openai' and use_openai) or (key == 'gemini' and use_gemini)
+            ):
+                model_scores[key] = prefetched[key]
         
         evaluation_time = time.time() - start_time
         logger.info(f"Parallel evaluation completed in {evaluation_time:.2f} seconds")
         
         return model_scores
     
-    async def _evaluate_with_openai(self, cell: CodeCell, api_key: str) -> ModelFeedback:
-        """Evaluate code using OpenAI GPT-4 with provided API key."""
+    def _skip_api_models(self, cell: CodeCell, use_codebert: bool, use_sqlcoder: bool) -> bool:
+        """Whether API models can be skipped for a trivial cell that a local evaluator scores."""
+        return settings.skip_trivial_cells and (use_codebert or use_sqlcoder) and _is_import_only(cell.code)
+    
+    async def _missing_api_key_feedback(self, key: str) -> ModelFeedback:
+        """Error feedback for a selected API model without a key."""
+        return self._create_error_feedback(MODEL_DISPLAY_NAMES[key], "No API key provided")
+    
+    async def evaluate_code_cells_batch(
+        self,
+        cells: List[CodeCell],
+        openai_api_key: Optional[str] = None,
+        google_api_key: Optional[str] = None,
+        use_openai: bool = False,
+        use_gemini: bool = False,
+        **model_options
+    ) -> List[Dict[str, ModelFeedback]]:
+        """Evaluate several cells with one request per API provider and batch.
+        
+        Returns one dict per cell with the feedback of every provider whose
+        batched response could be matched to that cell. Pass each dict to
+        evaluate_code_cell as ``prefetched``; anything missing is evaluated
+        per cell as usual.
+        """
+        prefetched = [{} for _ in cells]
+        if len(cells) < 2:
+            return prefetched
+        
+        providers = {}
+        if use_openai and openai_api_key:
+            providers['openai'] = (self._request_openai, openai_api_key, settings.openai_model)
+        if use_gemini and google_api_key:
+            providers['gemini'] = (self._request_gemini, google_api_key, settings.gemini_model)
+        if not providers:
+            return prefetched
+        
+        # Cached cells are answered directly; only the rest are sent in batches
+        jobs = []
+        for key, (request, api_key, model_id) in providers.items():
+            pending = []
+            for index, cell in enumerate(cells):
+                if self._skip_api_models(
+                    cell, model_options.get('use_codebert', True), model_options.get('use_sqlcoder', False)
+                ):
+                    continue
+                cached = await self._get_cached_response(self._response_cache_key(model_id, cell))
+                if cached is not None:
+                    prefetched[index][key] = cached
+                else:
+                    pending.append(index)
+            if len(pending) < 2:
+                continue
+            for indices in self._pack_batches(cells, pending):
+                batch = [cells[index] for index in indices]
+                jobs.append((key, model_id, indices, self._evaluate_batch(key, request, api_key, batch)))
+        
+        results = await asyncio.gather(*(job for *_, job in jobs))
+        
+        for (key, model_id, indices, _), batch_feedback in zip(jobs, results):
+            if batch_feedback is None:
+                continue
+            for index, model_feedback in zip(indices, batch_feedback):
+                self._cache_response(self._response_cache_key(model_id, cells[index]), model_feedback)
+                prefetched[index][key] = model_feedback
+        
+        return prefetched
+    
+    def _pack_batches(self, cells: List[CodeCell], pending: List[int]) -> List[List[int]]:
+        """Greedily group cell indices into batches bounded by cell count and estimated tokens."""
+        batch_size = max(1, settings.ai_batch_size)
+        batches = []
+        current: List[int] = []
+        current_tokens = 0
+        for index in pending:
+            # About four characters per token; a cell over the budget gets a batch of its own
+            cell_tokens = len(self._prompt_code(cells[index])) // 4 + 1
+            if current and (
+                len(current) >= batch_size
+                or current_tokens + cell_tokens > settings.ai_batch_max_tokens
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += cell_tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _evaluate_batch(
+        self,
+        key: str,
+        request,
+        api_key: str,
+        cells: List[CodeCell]
+    ) -> Optional[List[ModelFeedback]]:
+        """Send one batched prompt to a provider; None means fall back to per-cell calls."""
+        model_name = MODEL_DISPLAY_NAMES[key]
+        from google.api_core import exceptions as google_exceptions
+        
         try:
-            # Use OpenAI v0.x async API
-            import openai
-            
-            openai.api_key = api_key
-            
-            prompt = self.evaluation_prompt.format(
-                language=cell.language.value,
-                code=cell.code
+            content = await request(
+                self._create_batch_prompt(cells), api_key, settings.max_tokens * len(cells)
             )
-            
-            response = await openai.ChatCompletion.acreate(
-                model=settings.openai_model,
-                messages=[
-                    {"role": "system", "content": "You are an expert code reviewer and evaluator. Analyze the code thoroughly and provide detailed feedback."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=settings.max_tokens,
-                temperature=settings.temperature
+            return self._parse_batch_response(content, model_name, len(cells))
+        except (
+            openai.APIError, google_exceptions.GoogleAPIError, httpx.HTTPError,
+            asyncio.TimeoutError, orjson.JSONDecodeError, ValidationError
+        ) as e:
+            # Provider failures and unusable replies fall back; programming errors surface
+            logger.warning(f"Batched {model_name} evaluation failed, falling back to per-cell requests: {e}")
+            return None
+    
+    def _create_batch_prompt(self, cells: List[CodeCell]) -> str:
+        """Build a prompt that asks for one JSON evaluation object per numbered cell."""
+        parts = [self._batch_prompt_header]
+        for number, cell in enumerate(cells, 1):
+            parts.append(f"=== CELL {number} (Language: {cell.language.value}) ===\n{self._prompt_code(cell)}\n")
+        parts += (BATCH_RESPONSE_FORMAT_HEAD, str(len(cells)), BATCH_RESPONSE_FORMAT_TAIL)
+        return "".join(parts)
+    
+    def _parse_batch_response(self, content: str, model_name: str, expected: int) -> Optional[List[ModelFeedback]]:
+        """Split a batched response (a JSON array, possibly wrapped in {"cells": ...}) into per-cell feedback."""
+        array_start = content.find('[')
+        array_end = content.rfind(']') + 1
+        if array_start == -1 or array_end == 0:
+            logger.warning(f"No JSON array found in batched {model_name} response")
+            return None
+        
+        data = orjson.loads(content[array_start:array_end])
+        if not isinstance(data, list) or len(data) != expected or not all(
+            isinstance(item, dict) and isinstance(item.get("scores", {}), dict) for item in data
+        ):
+            logger.warning(f"Batched {model_name} response does not match the {expected} requested cells")
+            return None
+        
+        # Honour explicit cell numbers when the model reorders its answers
+        if all(isinstance(item.get("cell"), int) for item in data):
+            data.sort(key=lambda item: item["cell"])
+        
+        return [self._feedback_from_data(item, model_name) for item in data]
+    
+    async def _request_openai(self, prompt: str, api_key: str, max_tokens: int) -> str:
+        """Send a prompt to OpenAI and return the response text."""
+        client = self._openai_clients.get(api_key)
+        if client is None:
+            client = self._openai_clients[api_key] = openai.AsyncOpenAI(
+                api_key=api_key, http_client=self._openai_http_client
             )
+        
+        request = {
+            "model": settings.openai_model,
+            "messages": [
+                {"role": "system", "content": "You are an expert code reviewer and evaluator. Analyze the code thoroughly and provide detailed feedback."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": settings.temperature
+        }
+        
+        # Rough prompt size (about four characters per token) plus the response budget
+        estimated_tokens = len(prompt) // 4 + max_tokens
+        
+        # Ask for guaranteed-valid JSON; older models reject JSON mode, so
+        # remember those and send them plain requests from then on
+        if settings.openai_model not in self._json_mode_unsupported:
+            try:
+                return await self._call_with_retries(
+                    self._openai_semaphore,
+                    self._openai_bucket,
+                    estimated_tokens,
+                    _OPENAI_RETRYABLE_ERRORS,
+                    lambda: self._stream_openai(client, response_format={"type": "json_object"}, **request)
+                )
+            except openai.BadRequestError as e:
+                if "response_format" not in str(e):
+                    raise
+                logger.info(f"{settings.openai_model} does not support JSON mode; using plain responses")
+                self._json_mode_unsupported.add(settings.openai_model)
+        
+        return await self._call_with_retries(
+            self._openai_semaphore,
+            self._openai_bucket,
+            estimated_tokens,
+            _OPENAI_RETRYABLE_ERRORS,
+            lambda: self._stream_openai(client, **request)
+        )
+    
+    async def _call_with_retries(
+        self,
+        semaphore: asyncio.Semaphore,
+        bucket: _AsyncTokenBucket,
+        estimated_tokens: int,
+        retryable: Tuple,
+        make_call
+    ):
+        """Run an API call under a provider's rate limits, retrying transient failures with backoff."""
+        for attempt in range(settings.api_max_retries + 1):
+            try:
+                await bucket.acquire(estimated_tokens)
+                async with semaphore:
+                    return await make_call()
+            except retryable as e:
+                # An exhausted OpenAI quota will not recover by waiting
+                if attempt == settings.api_max_retries or getattr(e, 'code', None) == 'insufficient_quota':
+                    raise
+                delay = 2 ** attempt + random.random()
+                logger.warning(f"Transient API error ({type(e).__name__}); retrying in {delay:.1f}s")
+                # Back off outside the semaphore so other requests can use the slot
+                await asyncio.sleep(delay)
+    
+    async def _stream_openai(self, client: openai.AsyncOpenAI, **request) -> str:
+        """Stream an OpenAI completion, stopping generation once the JSON object is complete."""
+        collected = _JsonObjectStream()
+        stream = await client.chat.completions.create(stream=True, **request)
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta and collected.feed(delta):
+                    break
+        finally:
+            # Closing the stream early stops the model generating tokens nobody reads
+            await stream.close()
+        return collected.text
+    
+    async def _request_gemini(self, prompt: str, api_key: str, max_tokens: int) -> str:
+        """Send a prompt to Google Gemini and return the response text."""
+        model = self._gemini_models.get(api_key)
+        if model is None:
+            # The model binds its client to the configured key on its first call,
+            # which happens below before any other coroutine can reconfigure
+            genai.configure(api_key=api_key)
+            model = self._gemini_models[api_key] = genai.GenerativeModel(settings.gemini_model)
+        
+        from google.api_core import exceptions as google_exceptions
+        retryable = (
+            google_exceptions.ResourceExhausted,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.InternalServerError
+        )
+        
+        estimated_tokens = len(prompt) // 4 + max_tokens
+        
+        # Ask for a JSON response body; models without JSON mode fall back as for OpenAI
+        if settings.gemini_model not in self._json_mode_unsupported:
+            json_config = genai.types.GenerationConfig(
+                max_output_tokens=max_tokens,
+                temperature=settings.temperature,
+                response_mime_type="application/json"
+            )
+            try:
+                return await self._call_with_retries(
+                    self._gemini_semaphore,
+                    self._gemini_bucket,
+                    estimated_tokens,
+                    retryable,
+                    lambda: self._stream_gemini(model, prompt, json_config)
+                )
+            except google_exceptions.InvalidArgument as e:
+                if "response_mime_type" not in str(e):
+                    raise
+                logger.info(f"{settings.gemini_model} does not support JSON mode; using plain responses")
+                self._json_mode_unsupported.add(settings.gemini_model)
+        
+        plain_config = genai.types.GenerationConfig(
+            max_output_tokens=max_tokens,
+            temperature=settings.temperature
+        )
+        return await self._call_with_retries(
+            self._gemini_semaphore,
+            self._gemini_bucket,
+            estimated_tokens,
+            retryable,
+            lambda: self._stream_gemini(model, prompt, plain_config)
+        )
+    
+    async def _stream_gemini(self, model: genai.GenerativeModel, prompt: str, generation_config) -> str:
+        """Stream a Gemini response, stopping once the JSON object is complete."""
+        collected = _JsonObjectStream()
+        response = await model.generate_content_async(
+            prompt, generation_config=generation_config, stream=True
+        )
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. the final finish-reason chunk)
+                continue
+            if collected.feed(text):
+                break
+        return collected.text
+    
+    async def _evaluate_with_openai(self, cell: CodeCell, prompt: str, api_key: str) -> ModelFeedback:
+        """Evaluate code using OpenAI GPT-4 with provided API key."""
+        cache_key = self._response_cache_key(settings.openai_model, cell)
+        cached = await self._get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            content = await self._request_openai(prompt, api_key, settings.max_tokens)
+            return self._cache_response(cache_key, self._parse_ai_response(content, "OpenAI GPT-4"))
             
-            content = response.choices[0].message.content
-            return self._parse_ai_response(content, "OpenAI GPT-4")
-            
-        except openai.error.RateLimitError as e:
+        except openai.RateLimitError as e:
+            if getattr(e, 'code', None) == 'insufficient_quota':
+                logger.warning(f"OpenAI API quota exceeded: {e}")
+                return self._create_error_feedback(
+                    "OpenAI GPT-4", 
+                    "API quota exceeded. Please upgrade your plan or try again later. Using fallback evaluation."
+                )
             logger.warning(f"OpenAI API rate limit exceeded: {e}")
             return self._create_error_feedback(
                 "OpenAI GPT-4", 
                 "API rate limit exceeded. Please try again later or upgrade your plan. Using fallback evaluation."
             )
             
-        except openai.error.QuotaExceededError as e:
-            logger.warning(f"OpenAI API quota exceeded: {e}")
-            return self._create_error_feedback(
-                "OpenAI GPT-4", 
-                "API quota exceeded. Please upgrade your plan or try again later. Using fallback evaluation."
-            )
-            
-        except openai.error.AuthenticationError as e:
+        except openai.AuthenticationError as e:
             logger.error(f"OpenAI API authentication failed: {e}")
             return self._create_error_feedback("OpenAI GPT-4", f"Authentication failed: {e}")
             
-        except openai.error.InvalidRequestError as e:
+        except openai.BadRequestError as e:
             logger.error(f"OpenAI API invalid request: {e}")
             return self._create_error_feedback("OpenAI GPT-4", f"Invalid request: {e}")
             
-        except Exception as e:
+        except (openai.APIError, asyncio.TimeoutError) as e:
             logger.error(f"OpenAI evaluation error: {e}")
             return self._create_error_feedback("OpenAI GPT-4", str(e))
     
-    async def _evaluate_with_gemini(self, cell: CodeCell, api_key: str) -> ModelFeedback:
+    async def _evaluate_with_gemini(self, cell: CodeCell, prompt: str, api_key: str) -> ModelFeedback:
         """Evaluate code using Google Gemini with provided API key."""
+        cache_key = self._response_cache_key(settings.gemini_model, cell)
+        cached = await self._get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+        
+        from google.api_core import exceptions as google_exceptions
+        
         try:
-            # Create model with provided API key
-            import google.generativeai as genai
-            from google.api_core import exceptions as google_exceptions
-            
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(settings.gemini_model)
-            
-            prompt = self.evaluation_prompt.format(
-                language=cell.language.value,
-                code=cell.code
-            )
-            
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=settings.max_tokens,
-                    temperature=settings.temperature
-                )
-            )
-            
-            content = response.text
-            return self._parse_ai_response(content, "Google Gemini")
+            content = await self._request_gemini(prompt, api_key, settings.max_tokens)
+            return self._cache_response(cache_key, self._parse_ai_response(content, "Google Gemini"))
             
         except google_exceptions.ResourceExhausted as e:
             # Handle quota exceeded errors
@@ -385,56 +887,48 @@ CRITICAL: Respond with ONLY valid JSON. No markdown, no code blocks, no extra te
             logger.error(f"Google API invalid argument: {e}")
             return self._create_error_feedback("Google Gemini", f"Invalid argument: {e}")
             
-        except Exception as e:
+        except (google_exceptions.GoogleAPIError, asyncio.TimeoutError) as e:
             logger.error(f"Gemini evaluation error: {e}")
             return self._create_error_feedback("Google Gemini", str(e))
     
     async def _evaluate_with_enhanced(self, cell: CodeCell) -> ModelFeedback:
         """Evaluate code using Enhanced Task-Specific Evaluator."""
         try:
-            # Use the enhanced evaluator for comprehensive analysis
-            enhanced_result = await self.enhanced_evaluator.evaluate(cell)
+            # Resolve the evaluator in the worker too, so its first-use model load stays off the event loop
+            enhanced_result = await asyncio.get_running_loop().run_in_executor(
+                self._cpu_pool, lambda: self.enhanced_evaluator.evaluate_code(cell.code, cell.language.value)
+            )
             return enhanced_result
         except Exception as e:
             logger.error(f"Enhanced evaluation failed: {e}")
             return self._create_error_feedback('enhanced', str(e))
     
-    async def _evaluate_with_grok(self, cell: CodeCell, api_key: str) -> ModelFeedback:
-        """Evaluate code using Grok API with provided API key."""
+    async def _evaluate_with_sqlcoder(self, cell: CodeCell) -> ModelFeedback:
+        """Evaluate code using the SQLCoder evaluator."""
         try:
-            # Use Grok API (powered by Anthropic)
-            from anthropic import Anthropic
-            
-            # Initialize client with proxy handling
-            try:
-                client = Anthropic(api_key=api_key)
-            except TypeError as e:
-                if "proxies" in str(e):
-                    # Handle proxies argument issue
-                    import os
-                    # Temporarily remove any proxy environment variables
-                    old_proxy_vars = {}
-                    for var in ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy']:
-                        if var in os.environ:
-                            old_proxy_vars[var] = os.environ[var]
-                            del os.environ[var]
-                    
-                    try:
-                        client = Anthropic(api_key=api_key)
-                    finally:
-                        # Restore proxy environment variables
-                        for var, value in old_proxy_vars.items():
-                            os.environ[var] = value
-                else:
-                    raise e
-            
-            prompt = self.evaluation_prompt.format(
-                language=cell.language.value,
-                code=cell.code
+            return await asyncio.get_running_loop().run_in_executor(
+                self._cpu_pool, lambda: self.sqlcoder_evaluator.evaluate_sync(cell)
             )
+        except Exception as e:
+            logger.error(f"SQLCoder evaluation error: {e}")
+            return self._create_error_feedback('sqlcoder', str(e))
+    
+    async def _evaluate_with_grok(self, cell: CodeCell, prompt: str, api_key: str) -> ModelFeedback:
+        """Evaluate code using Grok API with provided API key."""
+        cache_key = self._response_cache_key(GROK_MODEL, cell)
+        cached = await self._get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+        
+        import anthropic
+        
+        try:
+            client = self._grok_client(api_key)
             
-            response = client.messages.create(
-                model="claude-3-5-sonnet-20241022",  # Use Claude model for Grok-like evaluation
+            # Stream like OpenAI and Gemini, leaving the stream once the JSON object closes
+            collected = _JsonObjectStream()
+            async with client.messages.stream(
+                model=GROK_MODEL,  # Use Claude model for Grok-like evaluation
                 max_tokens=settings.max_tokens,
                 temperature=settings.temperature,
                 messages=[
@@ -443,13 +937,16 @@ CRITICAL: Respond with ONLY valid JSON. No markdown, no code blocks, no extra te
                         "content": prompt
                     }
                 ]
-            )
+            ) as stream:
+                async for text in stream.text_stream:
+                    if collected.feed(text):
+                        break
             
-            content = response.content[0].text
+            content = collected.text
             
-            return self._parse_ai_response(content, "Grok")
+            return self._cache_response(cache_key, self._parse_ai_response(content, "Grok"))
             
-        except Exception as e:
+        except (anthropic.APIError, httpx.HTTPError, asyncio.TimeoutError) as e:
             logger.error(f"Grok evaluation error: {e}")
             return self._create_error_feedback("Grok", str(e))
     
@@ -459,173 +956,244 @@ CRITICAL: Respond with ONLY valid JSON. No markdown, no code blocks, no extra te
     
 
     
+    def _grok_client(self, api_key: str):
+        """Return the cached Anthropic client used for Grok evaluation with this key."""
+        client = self._grok_clients.get(api_key)
+        if client is None:
+            # Use Grok API (powered by Anthropic)
+            from anthropic import AsyncAnthropic
+            client = self._grok_clients[api_key] = AsyncAnthropic(
+                api_key=api_key, http_client=self._grok_http_client
+            )
+        return client
+    
+    def _response_cache_key(self, model_id: str, cell: CodeCell) -> str:
+        """Cache key for an API model's response to a cell under the current request settings."""
+        return hashlib.blake2b(
+            f"{model_id}|{self._prompt_fingerprint}|{settings.temperature}|{settings.max_tokens}|"
+            f"{cell.language.value}|{cell.code}".encode('utf-8'),
+            digest_size=16
+        ).hexdigest()
+    
+    async def _get_cached_response(self, cache_key: str) -> Optional[ModelFeedback]:
+        """Return a cached response, if any and the cache policy allows reads."""
+        if settings.response_cache_policy not in ("enabled", "read_only"):
+            return None
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            self._response_cache.move_to_end(cache_key)
+        elif self._response_store is not None:
+            cached = await asyncio.get_running_loop().run_in_executor(
+                self._store_pool, self._load_stored_response, cache_key
+            )
+            if cached is not None:
+                self._remember_response(cache_key, cached)
+        return cached
+    
+    def _cache_response(self, cache_key: str, feedback: ModelFeedback) -> ModelFeedback:
+        """Remember a successful response; failed ones (zero confidence) are not cached."""
+        if feedback.confidence > 0 and settings.response_cache_policy in ("enabled", "write_only"):
+            self._remember_response(cache_key, feedback)
+            if self._response_store is not None:
+                self._store_pool.submit(self._store_response, cache_key, feedback)
+        return feedback
+    
+    def _remember_response(self, cache_key: str, feedback: ModelFeedback) -> None:
+        """Add a response to the in-memory LRU, evicting the oldest entry when full."""
+        self._response_cache[cache_key] = feedback
+        if len(self._response_cache) > RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+    
+    def _open_response_store(self, path: str) -> Optional[sqlite3.Connection]:
+        """Open (creating if needed) the SQLite response cache; None keeps the cache in memory only."""
+        if not path:
+            return None
+        try:
+            # Used only from the store thread after this; WAL with synchronous=NORMAL
+            # makes commits cheap (no fsync until a checkpoint)
+            connection = sqlite3.connect(path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (cache_key TEXT PRIMARY KEY, feedback BLOB NOT NULL)"
+            )
+            connection.commit()
+            return connection
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache at {path} unavailable, using memory only: {e}")
+            return None
+    
+    def _load_stored_response(self, cache_key: str) -> Optional[ModelFeedback]:
+        """Look up a persisted response; unreadable entries count as misses."""
+        try:
+            row = self._response_store.execute(
+                "SELECT feedback FROM responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            return ModelFeedback.model_validate_json(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Failed to read cached response: {e}")
+            return None
+    
+    def _store_response(self, cache_key: str, feedback: ModelFeedback) -> None:
+        """Persist a response; a failed write only costs a future cache miss."""
+        try:
+            self._response_store.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, feedback) VALUES (?, ?)",
+                (cache_key, feedback.model_dump_json())
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist cached response: {e}")
+            return
+        # Queue one commit behind the writes already waiting, so a burst shares it
+        if not self._store_commit_pending:
+            self._store_commit_pending = True
+            self._store_pool.submit(self._commit_response_store)
+    
+    def _commit_response_store(self) -> None:
+        """Commit the writes queued since the last commit."""
+        self._store_commit_pending = False
+        try:
+            self._response_store.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to commit cached responses: {e}")
+    
     def _parse_ai_response(self, content: str, model_name: str) -> ModelFeedback:
         """Parse AI model response into structured feedback."""
+        # Clean the content - remove extra whitespace and newlines
+        content = content.strip()
+        logger.debug("Cleaned content: %r", content[:200])
+        
+        # Responses without a JSON object go straight to the text fallback
+        json_start = content.find('{')
+        if json_start < 0:
+            logger.error(f"Failed to parse {model_name} response: No JSON found in response")
+            return self._parse_text_response(content, model_name, "No JSON found in response")
+        
         try:
-            # Clean the content - remove extra whitespace and newlines
-            content = content.strip()
-            logger.info(f"Cleaned content: {repr(content[:200])}")
-            
-            # Extract JSON from response
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            
-            if json_start == -1 or json_end == 0:
-                raise ValueError("No JSON found in response")
+            json_match = _JSON_OBJECT_RE.search(content, json_start)
+            if json_match is None:
+                # Opened but never closed: the response was cut off at max_tokens
+                data = self._decode_truncated_json(content[json_start:])
+                return self._feedback_from_data(data, model_name)
             
-            json_str = content[json_start:json_end]
-            logger.info(f"Extracted JSON: {repr(json_str[:200])}")
+            json_str = json_match.group(0)
+            logger.debug("Extracted JSON: %r", json_str[:200])
             
             # Try to parse the JSON
             try:
-                data = json.loads(json_str)
-            except json.JSONDecodeError as json_error:
+                data = orjson.loads(json_str)
+            except orjson.JSONDecodeError as json_error:
                 # If JSON parsing fails, try to clean it further
                 logger.warning(f"Initial JSON parsing failed for {model_name}, trying to clean response. Error: {json_error}")
                 
-                # Remove any markdown formatting
-                json_str = json_str.replace('```json', '').replace('```', '').strip()
+                # Turn raw control whitespace (invalid inside JSON strings) into spaces,
+                # then remove markdown fences and escaped newlines/tabs in one pass
+                json_str = _JSON_NOISE_RE.sub('', json_str.translate(_JSON_WHITESPACE_TABLE))
                 
-                # Try to fix common JSON issues
-                json_str = json_str.replace('\n', ' ').replace('\r', ' ')
-                json_str = ' '.join(json_str.split())  # Normalize whitespace
-                
-                # Try to fix malformed JSON that starts with newlines or has escaped newlines
-                json_str = json_str.replace('\\n', '')
-                json_str = json_str.replace('\\t', '')
-                json_str = json_str.replace('\\r', '')
-                
-                # Remove any leading/trailing whitespace and quotes
-                json_str = json_str.strip().strip('"').strip("'")
-                
-                logger.info(f"Cleaned JSON: {repr(json_str[:200])}")
-                data = json.loads(json_str)
-            
-            # Extract scores
-            scores_data = data.get("scores", {})
-            
-            # Validate that scores are numeric
-            def validate_score(score, default=5.0):
-                if isinstance(score, (int, float)):
-                    return float(score)
-                elif isinstance(score, str):
-                    try:
-                        return float(score)
-                    except ValueError:
-                        return default
-                return default
-            
-            # Create ScoreBreakdown object with validated scores
-            scores = ScoreBreakdown(
-                correctness=validate_score(scores_data.get("correctness"), 5.0),
-                efficiency=validate_score(scores_data.get("efficiency"), 5.0),
-                readability=validate_score(scores_data.get("readability"), 5.0),
-                scalability=validate_score(scores_data.get("scalability"), 5.0),
-                security=validate_score(scores_data.get("security"), 5.0),
-                modularity=validate_score(scores_data.get("modularity"), 5.0),
-                documentation=validate_score(scores_data.get("documentation"), 5.0),
-                best_practices=validate_score(scores_data.get("best_practices"), 5.0),
-                error_handling=validate_score(scores_data.get("error_handling"), 5.0)
-            )
+                logger.debug("Cleaned JSON: %r", json_str[:200])
+                try:
+                    data = orjson.loads(json_str)
+                except orjson.JSONDecodeError:
+                    # Usually a reply cut off at max_tokens after the scores object
+                    # closed (inside "feedback" or "suggestions")
+                    data = self._decode_truncated_json(content[json_start:])
             
-            # Extract feedback and suggestions
-            feedback_text = data.get("feedback", "No feedback provided")
-            suggestions = data.get("suggestions", [])
-            confidence = validate_score(data.get("confidence"), 0.5)
+            return self._feedback_from_data(data, model_name)
             
-            return ModelFeedback(
-                model_name=model_name,
-                feedback=feedback_text,
-                suggestions=suggestions,
-                confidence=confidence,
-                scores=scores
-            )
-            
-        except Exception as e:
+        except (ValueError, TypeError, AttributeError) as e:
+            # Decode errors and pydantic ValidationError are ValueErrors; a JSON
+            # value of the wrong shape surfaces as TypeError/AttributeError
             logger.error(f"Failed to parse {model_name} response: {e}")
             logger.error(f"Raw content: {content[:500]}...")  # Log first 500 chars for debugging
+            return self._parse_text_response(content, model_name, str(e))
+    
+    def _decode_truncated_json(self, json_str: str) -> Dict:
+        """Recover the complete fields of a truncated JSON evaluation object.
+        
+        Only accepted when every criterion was scored before the cut; missing
+        scores are not padded with defaults.
+        """
+        # Partial mode closes open containers and keeps a trailing partial string
+        data = jiter.from_json(json_str.encode('utf-8'), partial_mode='trailing-strings')
+        if not isinstance(data, dict) or not isinstance(data.get("scores"), dict):
+            raise ValueError("Truncated response JSON has no scores")
+        missing = [criterion for criterion in SCORE_CRITERIA if criterion not in data["scores"]]
+        if missing:
+            raise ValueError(f"Truncated response JSON is missing scores: {', '.join(missing)}")
+        return data
+    
+    def _parse_text_response(self, content: str, model_name: str, error: str) -> ModelFeedback:
+        """Extract basic scores from a response that is not usable JSON."""
+        try:
+            # Look for any numeric scores in the text
+            scores_found = _TEXT_SCORE_RE.findall(content)
             
-            # Try to extract some basic information from the response even if JSON parsing fails
-            try:
-                # Look for any numeric scores in the text
-                import re
-                score_pattern = r'(\d+(?:\.\d+)?)\s*(?:out of\s*10|/10|score)'
-                scores_found = re.findall(score_pattern, content.lower())
+            if scores_found:
+                # Use the first few scores found, padded with the default score
+                scores_list = [float(s) for s in scores_found[:9]]  # Take up to 9 scores
+                scores_list += [5.0] * (len(SCORE_CRITERIA) - len(scores_list))
+                scores = ScoreBreakdown(**dict(zip(SCORE_CRITERIA, scores_list)))
                 
-                if scores_found:
-                    # Use the first few scores found
-                    scores_list = [float(s) for s in scores_found[:9]]  # Take up to 9 scores
-                    while len(scores_list) < 9:
-                        scores_list.append(5.0)  # Default score
-                    
-                    scores = ScoreBreakdown(
-                        correctness=scores_list[0] if len(scores_list) > 0 else 5.0,
-                        efficiency=scores_list[1] if len(scores_list) > 1 else 5.0,
-                        readability=scores_list[2] if len(scores_list) > 2 else 5.0,
-                        scalability=scores_list[3] if len(scores_list) > 3 else 5.0,
-                        security=scores_list[4] if len(scores_list) > 4 else 5.0,
-                        modularity=scores_list[5] if len(scores_list) > 5 else 5.0,
-                        documentation=scores_list[6] if len(scores_list) > 6 else 5.0,
-                        best_practices=scores_list[7] if len(scores_list) > 7 else 5.0,
-                        error_handling=scores_list[8] if len(scores_list) > 8 else 5.0
-                    )
-                    
-                    return ModelFeedback(
-                        model_name=model_name,
-                        feedback=f"Parsed from text response: {content[:200]}...",
-                        suggestions=["Consider improving code structure"],
-                        confidence=0.3,
-                        scores=scores
-                    )
-            except Exception as fallback_error:
-                logger.error(f"Fallback parsing also failed: {fallback_error}")
-            
-            return self._create_error_feedback(model_name, f"Failed to parse response: {e}")
+                return ModelFeedback(
+                    model_name=model_name,
+                    feedback=f"Parsed from text response: {content[:200]}...",
+                    suggestions=["Consider improving code structure"],
+                    confidence=0.3,
+                    scores=scores
+                )
+        except ValueError as fallback_error:
+            logger.error(f"Fallback parsing also failed: {fallback_error}")
+        
+        return self._create_error_feedback(model_name, f"Failed to parse response: {error}")
     
-    def _create_error_feedback(self, model_name: str, error_message: str) -> ModelFeedback:
-        """Create error feedback when evaluation fails."""
-        # Create default scores for error cases
-        default_scores = ScoreBreakdown(
-            correctness=5.0,
-            efficiency=5.0,
-            readability=5.0,
-            scalability=5.0,
-            security=5.0,
-            modularity=5.0,
-            documentation=5.0,
-            best_practices=5.0,
-            error_handling=5.0
+    def _feedback_from_data(self, data: Dict, model_name: str) -> ModelFeedback:
+        """Build ModelFeedback from one decoded evaluation object."""
+        # Extract scores
+        scores_data = data.get("scores", {})
+        
+        # Coerce all nine scores in one vectorized pass: non-numeric values take
+        # the default and out-of-range values are clipped to the 0-10 scale
+        raw_scores = np.fromiter(
+            (_coerce_number(scores_data.get(criterion)) for criterion in SCORE_CRITERIA),
+            dtype=np.float64,
+            count=len(SCORE_CRITERIA)
         )
+        score_vector = np.clip(np.nan_to_num(raw_scores, nan=5.0), 0.0, 10.0)
+        # Already coerced and clipped to range, so pydantic validation can be skipped
+        scores = ScoreBreakdown.model_construct(**dict(zip(SCORE_CRITERIA, score_vector.tolist())))
         
+        # Extract feedback and suggestions
+        feedback_text = data.get("feedback", "No feedback provided")
+        suggestions = data.get("suggestions", [])
+        confidence = _coerce_number(data.get("confidence"))
+        if np.isnan(confidence):
+            confidence = 0.5
+        
+        return ModelFeedback(
+            model_name=model_name,
+            feedback=feedback_text,
+            suggestions=suggestions,
+            confidence=confidence,
+            scores=scores
+        )
+    
+    def _create_error_feedback(self, model_name: str, error_message: str) -> ModelFeedback:
+        """Create error feedback when evaluation fails."""
         # Provide specific suggestions based on error type
-        if "quota" in error_message.lower() or "rate limit" in error_message.lower():
-            suggestions = [
-                "Upgrade your API plan to increase quota limits",
-                "Wait for quota reset and try again later",
-                "Use local models (Enhanced Evaluator) as fallback",
-                "Contact API provider for quota increase"
-            ]
-        elif "authentication" in error_message.lower():
-            suggestions = [
-                "Check your API key configuration",
-                "Verify API key is valid and active",
-                "Ensure API key has proper permissions",
-                "Use local models as alternative"
-            ]
+        error_lower = error_message.lower()
+        if "quota" in error_lower or "rate limit" in error_lower:
+            suggestions = self._QUOTA_ERROR_SUGGESTIONS
+        elif "authentication" in error_lower:
+            suggestions = self._AUTH_ERROR_SUGGESTIONS
         else:
-            suggestions = [
-                "Try using local models (Enhanced Evaluator)",
-                "Check your internet connection",
-                "Verify API service is available",
-                "Contact support if issue persists"
-            ]
+            suggestions = self._DEFAULT_ERROR_SUGGESTIONS
         
         return ModelFeedback(
             model_name=model_name,
             feedback=f"Evaluation failed: {error_message}",
             suggestions=suggestions,
             confidence=0.0,
-            scores=default_scores
+            scores=self._DEFAULT_SCORES
         )
     
 
@@ -633,93 +1201,82 @@ CRITICAL: Respond with ONLY valid JSON. No markdown, no code blocks, no extra te
     def calculate_overall_score(self, feedback: Dict[str, ModelFeedback]) -> Tuple[float, ScoreBreakdown]:
         """Calculate overall score and breakdown from model feedback."""
         try:
-            # Check if we have valid feedback from any model
-            valid_feedback = [f for f in feedback.values() if f.confidence > 0 and "Evaluation failed" not in f.feedback]
+            # Find the most confident valid feedback in one pass (the first one wins ties)
+            best_model = None
+            best_confidence = 0.0
+            for model_feedback in feedback.values():
+                if model_feedback.confidence > best_confidence and "Evaluation failed" not in model_feedback.feedback:
+                    best_model = model_feedback
+                    best_confidence = model_feedback.confidence
+                    if best_confidence >= 1.0:
+                        # Confidence is capped at 1, so nothing later can beat it
+                        break
             
-            if not valid_feedback:
-                # No valid feedback available, return error scores
-                scores = ScoreBreakdown(
-                    correctness=0.0,
-                    efficiency=0.0,
-                    readability=0.0,
-                    scalability=0.0,
-                    security=0.0,
-                    modularity=0.0,
-                    documentation=0.0,
-                    best_practices=0.0,
-                    error_handling=0.0
-                )
-                return 0.0, scores
-            
-            # Use the most confident model's scores
-            best_model = max(valid_feedback, key=lambda x: x.confidence)
-            
-            # Use the actual scores from the model feedback
-            if best_model.scores:
-                scores = best_model.scores
-            else:
-                # No scores available from AI models
-                scores = ScoreBreakdown(
-                    correctness=0.0,
-                    efficiency=0.0,
-                    readability=0.0,
-                    scalability=0.0,
-                    security=0.0,
-                    modularity=0.0,
-                    documentation=0.0,
-                    best_practices=0.0,
-                    error_handling=0.0
-                )
+            if best_model is None or not best_model.scores:
+                # No valid feedback or no scores available, return error scores
+                return 0.0, self._ZERO_SCORES
             
             # Calculate overall score as average
-            overall_score = sum([
-                scores.correctness, scores.efficiency, scores.readability,
-                scores.scalability, scores.security, scores.modularity,
-                scores.documentation, scores.best_practices, scores.error_handling
-            ]) / 9.0
+            scores = best_model.scores
+            overall_score = float(scores.as_array().mean())
             
             return overall_score, scores
             
         except Exception as e:
             logger.error(f"Score calculation failed: {e}")
             # Return error scores
-            error_scores = ScoreBreakdown(
-                correctness=0.0,
-                efficiency=0.0,
-                readability=0.0,
-                scalability=0.0,
-                security=0.0,
-                modularity=0.0,
-                documentation=0.0,
-                best_practices=0.0,
-                error_handling=0.0
-            )
-            return 0.0, error_scores
+            return 0.0, self._ZERO_SCORES
     
     def aggregate_suggestions(self, feedback: Dict[str, ModelFeedback]) -> List[str]:
         """Aggregate suggestions from all models."""
-        suggestions = set()
-        
-        for model_feedback in feedback.values():
-            suggestions.update(model_feedback.suggestions)
+        # A single model's suggestions need no deduplication
+        if len(feedback) == 1:
+            return list(next(iter(feedback.values())).suggestions)
         
-        return list(suggestions)
+        # Ordered dedup keeps suggestions in the order the models returned them
+        return list(dict.fromkeys(
+            suggestion
+            for model_feedback in feedback.values()
+            for suggestion in model_feedback.suggestions
+        ))
     
     def identify_issues(self, feedback: Dict[str, ModelFeedback]) -> List[str]:
         """Identify common issues across model evaluations."""
         issues = []
         
+        # One scan per model's lowercased feedback collects every issue keyword it mentions
+        mentioned = set()
+        security_vulnerability = False
         for model_feedback in feedback.values():
-            # Look for common issue patterns in feedback
-            if "error" in model_feedback.feedback.lower():
-                issues.append("Code contains errors")
-            if "security" in model_feedback.feedback.lower() and "vulnerability" in model_feedback.feedback.lower():
-                issues.append("Security vulnerabilities detected")
-            if "performance" in model_feedback.feedback.lower():
-                issues.append("Performance issues identified")
+            keywords = set(_ISSUE_KEYWORD_RE.findall(model_feedback.feedback.lower()))
+            mentioned |= keywords
+            security_vulnerability = security_vulnerability or {'security', 'vulnerability'} <= keywords
+            # Remaining models cannot add another issue once all three are found
+            if security_vulnerability and {'error', 'performance'} <= mentioned:
+                break
         
-        return list(set(issues))
+        # Look for common issue patterns in feedback
+        if 'error' in mentioned:
+            issues.append("Code contains errors")
+        if security_vulnerability:
+            issues.append("Security vulnerabilities detected")
+        if 'performance' in mentioned:
+            issues.append("Performance issues identified")
+        
+        return issues
+
+
+# Global evaluator instance, created on first use so importing this module
+# does not load the local evaluator models
+_evaluator: Optional[AIEvaluator] = None
+_evaluator_lock = threading.Lock()
 
 
-# Global evaluator instance
-evaluator = AIEvaluator() 
\ No newline at end of file
+def get_evaluator() -> AIEvaluator:
+    """Get the shared AIEvaluator, creating it on first call."""
+    global _evaluator
+    if _evaluator is None:
+        with _evaluator_lock:
+            if _evaluator is None:
+                _evaluator = AIEvaluator()
+    return _evaluator 
\ No newline at end of file
@@ -6,21 +6,28 @@ Uses pre-trained models for accurate code analysis and scoring
 
 import re
 import ast
-import json
+import hashlib
 import logging
 import subprocess
 import tempfile
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 import numpy as np
+import orjson
 from transformers import AutoTokenizer, AutoModel
 import torch
 from app.models import ScoreBreakdown, ModelFeedback
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Maximum number of external tool results kept in memory (keyed by code hash)
+TOOL_CACHE_SIZE = 256
+
+@dataclass(slots=True)
 class CodeMetrics:
     """Code quality metrics calculated by CodeBERT evaluator."""
     complexity: float
@@ -49,6 +56,12 @@ class CodeBERTEvaluator:
             self.model = None
             self.tokenizer = None
         
+        # Cache of SQLFluff/Semgrep results for previously seen SQL
+        self._tool_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._tool_cache_lock = threading.Lock()
+        # Long-lived worker threads for the Semgrep subprocess, instead of a new pool per call
+        self._tool_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sql-tools")
+        
         # Check for external tools
         self.sqlfluff_available = self._check_sqlfluff()
         self.semgrep_available = self._check_semgrep()
@@ -89,8 +102,7 @@ class CodeBERTEvaluator:
             tool_results = {}
             if language.lower() == 'sql':
                 logger.info("Running SQL-specific tool analysis")
-                tool_results['sqlfluff'] = self._run_sqlfluff_analysis(code)
-                tool_results['semgrep'] = self._run_semgrep_analysis(code)
+                tool_results = self._run_sql_tool_analysis(code)
                 # Note: SQLCheck is not available, so we'll use enhanced rule-based analysis
             
             # Calculate metrics with tool integration
@@ -119,6 +131,30 @@ class CodeBERTEvaluator:
             logger.error(f"CodeBERT evaluation failed: {e}")
             return self._create_error_feedback(f"CodeBERT evaluation failed: {e}")
     
+    def _run_sql_tool_analysis(self, code: str) -> Dict:
+        """Run SQLFluff and Semgrep on SQL code, reusing results for identical code."""
+        cache_key = hashlib.sha256(code.encode('utf-8')).hexdigest()
+        with self._tool_cache_lock:
+            cached = self._tool_cache.get(cache_key)
+            if cached is not None:
+                self._tool_cache.move_to_end(cache_key)
+                return dict(cached)
+        
+        # SQLFluff and Semgrep are independent subprocesses; run Semgrep on the
+        # shared pool while this thread runs SQLFluff
+        semgrep_future = self._tool_pool.submit(self._run_semgrep_analysis, code)
+        tool_results = {
+            'sqlfluff': self._run_sqlfluff_analysis(code),
+            'semgrep': semgrep_future.result()
+        }
+        
+        with self._tool_cache_lock:
+            self._tool_cache[cache_key] = tool_results
+            if len(self._tool_cache) > TOOL_CACHE_SIZE:
+                self._tool_cache.popitem(last=False)
+        
+        return dict(tool_results)
+    
     def _calculate_metrics_with_tools(self, code: str, language: str, tool_results: Dict) -> CodeMetrics:
         """Calculate comprehensive code metrics with external tool integration."""
         metrics = CodeMetrics(
@@ -1024,13 +1060,13 @@ class CodeBERTEvaluator:
             
             if result.returncode == 0:
                 try:
-                    issues = json.loads(result.stdout)
+                    issues = orjson.loads(result.stdout)
                     return {
                         "available": True,
                         "issues": issues.get('files', [{}])[0].get('violations', []),
                         "score": self._calculate_sqlfluff_score(issues.get('files', [{}])[0].get('violations', []))
                     }
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     return {"available": True, "issues": [], "score": 5.0}
             else:
                 return {"available": True, "issues": [], "score": 5.0}
@@ -1059,13 +1095,13 @@ class CodeBERTEvaluator:
             
             if result.returncode in [0, 1]:  # Semgrep returns 1 when issues are found
                 try:
-                    issues = json.loads(result.stdout)
+                    issues = orjson.loads(result.stdout)
                     return {
                         "available": True,
                         "issues": issues.get('results', []),
                         "score": self._calculate_semgrep_score(issues.get('results', []))
                     }
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     return {"available": True, "issues": [], "score": 5.0}
             else:
                 return {"available": True, "issues": [], "score": 5.0}
@@ -1094,13 +1130,13 @@ class CodeBERTEvaluator:
             
             if result.returncode == 0:
                 try:
-                    issues = json.loads(result.stdout)
+                    issues = orjson.loads(result.stdout)
                     return {
                         "available": True,
                         "issues": issues.get('issues', []),
                         "score": self._calculate_sqlcheck_score(issues.get('issues', []))
                     }
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     return {"available": True, "issues": [], "score": 5.0}
             else:
                 return {"available": True, "issues": [], "score": 5.0}
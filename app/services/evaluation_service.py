@@ -14,15 +14,18 @@ from datetime import datetime
 from typing import List, Dict, Optional
 from pathlib import Path
 
+import numpy as np
+
 from app.models import (
     EvaluationRequest, 
     EvaluationStatus, 
     NotebookFile,
     CodeCell,
-    ScoreBreakdown
+    ScoreBreakdown,
+    SCORE_CRITERIA
 )
 from app.services.notebook_parser import parser
-from app.services.ai_evaluator import evaluator
+from app.services.ai_evaluator import get_evaluator
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -34,6 +37,8 @@ class EvaluationService:
     def __init__(self):
         """Initialize the evaluation service."""
         self.active_evaluations: Dict[str, EvaluationRequest] = {}
+        # Strong references to running evaluation tasks (the event loop only keeps weak ones)
+        self._background_tasks: set = set()
     
     async def start_evaluation(
         self, 
@@ -63,10 +68,12 @@ class EvaluationService:
         self.active_evaluations[evaluation_id] = evaluation_request
         
         # Start background evaluation with API keys and model selection
-        asyncio.create_task(self._evaluate_file(
+        task = asyncio.create_task(self._evaluate_file(
             evaluation_id, file_path, openai_api_key, google_api_key, grok_api_key,
             use_codebert, use_sqlcoder, use_openai, use_gemini, use_grok
         ))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
         
         logger.info(f"Started evaluation {evaluation_id} for {filename}")
         return evaluation_id
@@ -92,84 +99,76 @@ class EvaluationService:
             evaluation.status = EvaluationStatus.PROCESSING
             evaluation.started_at = datetime.utcnow()
             
-            # Parse notebook files
-            notebook_files = parser.parse_file(file_path)
+            # Parse notebook files (zip extraction and JSON decoding are blocking)
+            notebook_files = await asyncio.to_thread(parser.parse_file, file_path)
             evaluation.total_files = len(notebook_files)
             evaluation.total_cells = sum(len(f.cells) for f in notebook_files)
             evaluation.progress = 10.0
             
-            # Evaluate each file
-            evaluated_files = []
-            total_cells = evaluation.total_cells
-            processed_cells = 0
+            # One deadline bounds the whole evaluation: the batched prefetch plus every file
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.evaluation_timeout
+            
+            # Evaluate files concurrently; cells within a file keep their order
+            model_options = {
+                "openai_api_key": openai_api_key,
+                "google_api_key": google_api_key,
+                "grok_api_key": grok_api_key,
+                "use_codebert": use_codebert,
+                "use_sqlcoder": use_sqlcoder,
+                "use_openai": use_openai,
+                "use_gemini": use_gemini,
+                "use_grok": use_grok
+            }
+            # API providers score the cells of all files in shared batched requests up front,
+            # so small notebooks fill a batch together instead of paying a round-trip each
+            all_cells = [cell for notebook_file in notebook_files for cell in notebook_file.cells]
+            # The first call loads the local evaluator models; keep that off the event loop
+            evaluator = await asyncio.to_thread(get_evaluator)
+            # Bounded like a single model call (and by the overall deadline), so a stalled
+            # provider leaves the rest of the budget to the cells; on timeout every cell
+            # is evaluated individually
+            prefetch_timeout = min(settings.model_timeout, max(0.0, deadline - loop.time()))
+            try:
+                batched_feedback = await asyncio.wait_for(
+                    evaluator.evaluate_code_cells_batch(all_cells, **model_options),
+                    timeout=prefetch_timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Batched evaluation exceeded {prefetch_timeout:.0f}s; evaluating cells individually"
+                )
+                batched_feedback = [{} for _ in all_cells]
+            except Exception as e:
+                logger.warning(f"Batched evaluation failed: {e}")
+                batched_feedback = [{} for _ in all_cells]
             
+            file_feedback = []
+            offset = 0
             for notebook_file in notebook_files:
-                logger.info(f"Evaluating file {notebook_file.filename}")
-                
-                # Evaluate each cell in the file
-                evaluated_cells = []
-                for cell in notebook_file.cells:
-                    try:
-                        # Evaluate with AI models using provided API keys and model selection
-                        feedback = await evaluator.evaluate_code_cell(
-                            cell, 
-                            openai_api_key, 
-                            google_api_key,
-                            grok_api_key,
-                            use_codebert=use_codebert,
-                            use_sqlcoder=use_sqlcoder,
-                            use_openai=use_openai,
-                            use_gemini=use_gemini,
-                            use_grok=use_grok
-                        )
-                        
-                        # Calculate scores
-                        overall_score, scores = evaluator.calculate_overall_score(feedback)
-                        
-                        # Update cell with results
-                        cell.scores = scores
-                        cell.overall_score = overall_score
-                        cell.feedback = feedback
-                        cell.suggestions = evaluator.aggregate_suggestions(feedback)
-                        cell.issues = evaluator.identify_issues(feedback)
-                        cell.updated_at = datetime.utcnow()
-                        
-                        evaluated_cells.append(cell)
-                        
-                        # Update progress
-                        processed_cells += 1
-                        evaluation.processed_cells = processed_cells
-                        evaluation.progress = 10.0 + (processed_cells / total_cells) * 80.0
-                        
-                    except Exception as e:
-                        logger.error(f"Error evaluating cell: {e}")
-                        # Create error cell
-                        error_cell = cell
-                        error_cell.scores = ScoreBreakdown(
-                            correctness=0.0, efficiency=0.0, readability=0.0,
-                            scalability=0.0, security=0.0, modularity=0.0,
-                            documentation=0.0, best_practices=0.0, error_handling=0.0
+                file_feedback.append(batched_feedback[offset:offset + len(notebook_file.cells)])
+                offset += len(notebook_file.cells)
+            
+            # One concurrency bound for the whole evaluation, shared by the files. The files
+            # share the remaining deadline too: a per-file timer would also count time spent
+            # queued behind other files' cells
+            cell_semaphore = asyncio.Semaphore(max(1, settings.max_concurrent_cells))
+            try:
+                evaluated_files = await asyncio.wait_for(
+                    asyncio.gather(*(
+                        self._evaluate_notebook(
+                            evaluation, notebook_file, prefetched, model_options, cell_semaphore
                         )
-                        error_cell.overall_score = 0.0
-                        error_cell.feedback = {"error": f"Evaluation failed: {e}"}
-                        error_cell.suggestions = ["Please try again or contact support"]
-                        error_cell.issues = ["Evaluation error occurred"]
-                        error_cell.updated_at = datetime.utcnow()
-                        evaluated_cells.append(error_cell)
-                        
-                        processed_cells += 1
-                        evaluation.processed_cells = processed_cells
-                        evaluation.progress = 10.0 + (processed_cells / total_cells) * 80.0
-                
-                # Calculate file-level scores
-                file_score = self._calculate_file_score(evaluated_cells)
-                file_breakdown = self._calculate_file_breakdown(evaluated_cells)
-                
-                # Update notebook file with evaluated cells and scores
-                notebook_file.cells = evaluated_cells
-                notebook_file.overall_score = file_score
-                notebook_file.score_breakdown = file_breakdown
-                evaluated_files.append(notebook_file)
+                        for notebook_file, prefetched in zip(notebook_files, file_feedback)
+                    )),
+                    timeout=max(0.0, deadline - loop.time())
+                )
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Evaluation {evaluation_id} exceeded {settings.evaluation_timeout}s; "
+                    f"keeping partially scored cells"
+                )
+                evaluated_files = [self._finish_timed_out_file(notebook_file) for notebook_file in notebook_files]
             
             # Calculate final scores
             all_scores = []
@@ -180,23 +179,11 @@ class EvaluationService:
             
             if all_scores:
                 # Calculate average scores across all cells
-                avg_scores = ScoreBreakdown(
-                    correctness=sum(s.correctness for s in all_scores) / len(all_scores),
-                    efficiency=sum(s.efficiency for s in all_scores) / len(all_scores),
-                    readability=sum(s.readability for s in all_scores) / len(all_scores),
-                    scalability=sum(s.scalability for s in all_scores) / len(all_scores),
-                    security=sum(s.security for s in all_scores) / len(all_scores),
-                    modularity=sum(s.modularity for s in all_scores) / len(all_scores),
-                    documentation=sum(s.documentation for s in all_scores) / len(all_scores),
-                    best_practices=sum(s.best_practices for s in all_scores) / len(all_scores),
-                    error_handling=sum(s.error_handling for s in all_scores) / len(all_scores)
-                )
+                criterion_means = self._score_matrix(all_scores).mean(axis=0)
+                # Means of validated scores are in range; skip re-validation
+                avg_scores = ScoreBreakdown.model_construct(**dict(zip(SCORE_CRITERIA, criterion_means.tolist())))
                 
-                evaluation.overall_score = sum([
-                    avg_scores.correctness, avg_scores.efficiency, avg_scores.readability,
-                    avg_scores.scalability, avg_scores.security, avg_scores.modularity,
-                    avg_scores.documentation, avg_scores.best_practices, avg_scores.error_handling
-                ]) / 9.0
+                evaluation.overall_score = float(criterion_means.mean())
                 
                 evaluation.project_score = evaluation.overall_score
                 evaluation.scores = avg_scores
@@ -223,6 +210,86 @@ class EvaluationService:
             evaluation.error_message = str(e)
             evaluation.completed_at = datetime.utcnow()
     
+    def _finish_timed_out_file(self, notebook_file: NotebookFile) -> NotebookFile:
+        """Score a file from the cells evaluated before the deadline; cells are updated in place."""
+        for cell in notebook_file.cells:
+            if cell.scores is None:
+                cell.issues = ["Evaluation timed out"]
+        
+        notebook_file.overall_score = self._calculate_file_score(notebook_file.cells)
+        notebook_file.score_breakdown = self._calculate_file_breakdown(notebook_file.cells)
+        return notebook_file
+    
+    async def _evaluate_notebook(
+        self,
+        evaluation: EvaluationRequest,
+        notebook_file: NotebookFile,
+        batched_feedback: List[Dict],
+        model_options: Dict,
+        cell_semaphore: asyncio.Semaphore
+    ) -> NotebookFile:
+        """Evaluate every cell of a single file and attach file-level scores."""
+        logger.info(f"Evaluating file {notebook_file.filename}")
+        evaluator = get_evaluator()
+        
+        # Evaluate the file's cells concurrently (bounded across all files, so local
+        # evaluators and API quotas are not flooded); gather keeps the results in cell order
+        evaluated_cells = await asyncio.gather(*(
+            self._evaluate_cell(evaluator, evaluation, cell, prefetched, model_options, cell_semaphore)
+            for cell, prefetched in zip(notebook_file.cells, batched_feedback)
+        ))
+        
+        # Calculate file-level scores
+        notebook_file.cells = list(evaluated_cells)
+        notebook_file.overall_score = self._calculate_file_score(evaluated_cells)
+        notebook_file.score_breakdown = self._calculate_file_breakdown(evaluated_cells)
+        return notebook_file
+    
+    async def _evaluate_cell(
+        self,
+        evaluator,
+        evaluation: EvaluationRequest,
+        cell: CodeCell,
+        prefetched: Dict,
+        model_options: Dict,
+        semaphore: asyncio.Semaphore
+    ) -> CodeCell:
+        """Evaluate one cell in place and advance the evaluation's progress."""
+        async with semaphore:
+            try:
+                # Evaluate with AI models using provided API keys and model selection
+                feedback = await evaluator.evaluate_code_cell(cell, prefetched=prefetched, **model_options)
+                
+                # Calculate scores
+                overall_score, scores = evaluator.calculate_overall_score(feedback)
+                
+                # Update cell with results
+                cell.scores = scores
+                cell.overall_score = overall_score
+                cell.feedback = feedback
+                cell.suggestions = evaluator.aggregate_suggestions(feedback)
+                cell.issues = evaluator.identify_issues(feedback)
+                cell.updated_at = datetime.utcnow()
+                
+            except Exception as e:
+                logger.error(f"Error evaluating cell: {e}")
+                # Mark as error cell
+                cell.scores = ScoreBreakdown(
+                    correctness=0.0, efficiency=0.0, readability=0.0,
+                    scalability=0.0, security=0.0, modularity=0.0,
+                    documentation=0.0, best_practices=0.0, error_handling=0.0
+                )
+                cell.overall_score = 0.0
+                cell.feedback = {"error": f"Evaluation failed: {e}"}
+                cell.suggestions = ["Please try again or contact support"]
+                cell.issues = ["Evaluation error occurred"]
+                cell.updated_at = datetime.utcnow()
+        
+        # Update progress (shared across files running on the same loop)
+        evaluation.processed_cells += 1
+        evaluation.progress = 10.0 + (evaluation.processed_cells / evaluation.total_cells) * 80.0
+        return cell
+    
     def _calculate_file_score(self, cells: List[CodeCell]) -> float:
         """Calculate overall score for a file."""
         if not cells:
@@ -241,20 +308,9 @@ class EvaluationService:
             )
         
         # Aggregate scores from all cells
-        total_scores = {
-            'correctness': 0.0, 'efficiency': 0.0, 'readability': 0.0,
-            'scalability': 0.0, 'security': 0.0, 'modularity': 0.0,
-            'documentation': 0.0, 'best_practices': 0.0, 'error_handling': 0.0
-        }
+        scored = [cell.scores for cell in cells if cell.scores]
         
-        valid_cells = 0
-        for cell in cells:
-            if cell.scores:
-                valid_cells += 1
-                for criterion in total_scores:
-                    total_scores[criterion] += getattr(cell.scores, criterion)
-        
-        if valid_cells == 0:
+        if not scored:
             return ScoreBreakdown(
                 correctness=0.0, efficiency=0.0, readability=0.0,
                 scalability=0.0, security=0.0, modularity=0.0,
@@ -262,9 +318,12 @@ class EvaluationService:
             )
         
         # Calculate averages
-        avg_scores = {k: v / valid_cells for k, v in total_scores.items()}
-        
-        return ScoreBreakdown(**avg_scores)
+        criterion_means = self._score_matrix(scored).mean(axis=0)
+        return ScoreBreakdown.model_construct(**dict(zip(SCORE_CRITERIA, criterion_means.tolist())))
+    
+    def _score_matrix(self, scores: List[ScoreBreakdown]) -> np.ndarray:
+        """Stack score breakdowns into an (n_cells, n_criteria) array."""
+        return np.stack([score.as_array() for score in scores])
     
     def _calculate_project_score(self, files: List[NotebookFile]) -> float:
         """Calculate overall project score."""
@@ -274,6 +333,17 @@ class EvaluationService:
         scores = [f.overall_score for f in files if f.overall_score is not None]
         return sum(scores) / len(scores) if scores else 0.0
     
+    def get_total_evaluations(self) -> int:
+        """Get the number of evaluations tracked by this service."""
+        return len(self.active_evaluations)
+    
+    def get_in_progress_count(self) -> int:
+        """Get the number of evaluations that are still pending or processing."""
+        return sum(
+            1 for evaluation in self.active_evaluations.values()
+            if evaluation.status in (EvaluationStatus.PENDING, EvaluationStatus.PROCESSING)
+        )
+    
     def get_evaluation(self, evaluation_id: str) -> Optional[EvaluationRequest]:
         """Get evaluation by ID."""
         return self.active_evaluations.get(evaluation_id)
@@ -334,31 +404,38 @@ class EvaluationService:
     def get_statistics(self) -> Dict:
         """Get evaluation statistics."""
         total_evaluations = len(self.active_evaluations)
-        completed = sum(1 for e in self.active_evaluations.values() if e.status == EvaluationStatus.COMPLETED)
-        failed = sum(1 for e in self.active_evaluations.values() if e.status == EvaluationStatus.FAILED)
-        
-        # Calculate average score
-        scores = [e.project_score for e in self.active_evaluations.values() if e.project_score is not None]
-        average_score = sum(scores) / len(scores) if scores else 0.0
+        completed = 0
+        failed = 0
+        score_total = 0.0
+        score_count = 0
+        processing_time_total = 0.0
+        processing_count = 0
+        languages = {}
         
-        # Calculate average processing time
-        processing_times = []
+        # Gather counts, scores, timings and languages in a single pass
         for evaluation in self.active_evaluations.values():
+            if evaluation.status == EvaluationStatus.COMPLETED:
+                completed += 1
+            elif evaluation.status == EvaluationStatus.FAILED:
+                failed += 1
+            
+            if evaluation.project_score is not None:
+                score_total += evaluation.project_score
+                score_count += 1
+            
             if evaluation.completed_at and evaluation.created_at:
-                processing_time = (evaluation.completed_at - evaluation.created_at).total_seconds()
-                processing_times.append(processing_time)
-        
-        avg_processing_time = sum(processing_times) / len(processing_times) if processing_times else 0.0
-        
-        # Count languages
-        languages = {}
-        for evaluation in self.active_evaluations.values():
+                processing_time_total += (evaluation.completed_at - evaluation.created_at).total_seconds()
+                processing_count += 1
+            
             if evaluation.files:
                 for notebook_file in evaluation.files:
                     for cell in notebook_file.cells:
                         lang = cell.language.value
                         languages[lang] = languages.get(lang, 0) + 1
         
+        average_score = score_total / score_count if score_count else 0.0
+        avg_processing_time = processing_time_total / processing_count if processing_count else 0.0
+        
         return {
             "total_evaluations": total_evaluations,
             "completed_evaluations": completed,
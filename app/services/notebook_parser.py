@@ -7,19 +7,30 @@ Extracts code cells and identifies programming languages.
 
 import json
 import logging
+import re
+import threading
 import zipfile
-import tempfile
 import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 import nbformat
-from nbformat import NotebookNode
+import orjson
 
 from app.models import CodeCell, NotebookFile, LanguageType
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Language hints, matched as case-insensitive substrings in a single scan
+SQL_KEYWORDS = ('select', 'from', 'where', 'insert', 'update', 'delete', 'create', 'drop', 'alter')
+PYSPARK_KEYWORDS = ('spark', 'spark.sql', 'dataframe', 'rdd', 'pyspark')
+
+_SQL_KEYWORD_RE = re.compile('|'.join(map(re.escape, SQL_KEYWORDS)), re.IGNORECASE)
+_PYSPARK_KEYWORD_RE = re.compile('|'.join(map(re.escape, PYSPARK_KEYWORDS)), re.IGNORECASE)
+
 
 class NotebookParser:
     """Parser for Jupyter notebooks and code files."""
@@ -33,6 +44,18 @@ class NotebookParser:
             '.scala': self._parse_scala_file,
             '.r': self._parse_r_file
         }
+        # Single-cell source files: extension -> (evaluation language, display name)
+        self.source_languages = {
+            '.py': (LanguageType.PYTHON, 'Python'),
+            '.sql': (LanguageType.SQL, 'SQL'),
+            '.scala': (LanguageType.PYSPARK, 'Scala'),  # Treat as PySpark for evaluation
+            '.r': (LanguageType.PYTHON, 'R')  # Treat as Python for evaluation
+        }
+        # Shared pool for decompressing and decoding ZIP members in parallel
+        self._parse_workers = min(8, os.cpu_count() or 1)
+        self._parse_pool = ThreadPoolExecutor(
+            max_workers=self._parse_workers, thread_name_prefix="notebook-parse"
+        )
     
     def parse_file(self, file_path: str) -> List[NotebookFile]:
         """Parse a single file or ZIP archive containing multiple files."""
@@ -54,53 +77,122 @@ class NotebookParser:
         
         try:
             with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                # Check for zip bomb
-                total_size = sum(info.file_size for info in zip_ref.filelist)
+                # Index supported entries and check for zip bomb in one pass
+                entries, total_size = self._index_zip_entries(zip_ref)
                 if total_size > settings.max_file_size:
                     raise ValueError(f"ZIP file too large: {total_size} bytes")
                 
-                # Extract and parse each file
-                for file_info in zip_ref.filelist:
-                    if file_info.is_dir():
-                        continue
-                    
-                    file_ext = Path(file_info.filename).suffix.lower()
-                    if file_ext in self.supported_extensions:
-                        try:
-                            # Extract file to temporary location
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-                                with zip_ref.open(file_info.filename) as source_file:
-                                    temp_file.write(source_file.read())
-                                    temp_file_path = temp_file.name
-                            
-                            # Parse the file
-                            notebook_file = self.supported_extensions[file_ext](temp_file_path, file_info.filename)
-                            if notebook_file:
-                                notebook_files.append(notebook_file)
-                            
-                            # Clean up temporary file
-                            os.unlink(temp_file_path)
-                            
-                        except Exception as e:
-                            logger.error(f"Failed to parse {file_info.filename}: {e}")
-                            continue
-                
+                # With one worker (or member) the pool buys nothing; read in place
+                parallel = self._parse_workers > 1 and len(entries) > 1
+                if not parallel:
+                    parsed = [self._parse_member(zip_ref, *entry) for entry in entries]
+            
+            if parallel:
+                parsed = self._parse_members_in_parallel(zip_path, entries)
+            
+            notebook_files = [notebook_file for notebook_file in parsed if notebook_file]
+            
         except Exception as e:
             logger.error(f"Failed to parse ZIP file {zip_path}: {e}")
             raise
         
         return notebook_files
     
+    def _index_zip_entries(self, zip_ref: zipfile.ZipFile) -> Tuple[List[Tuple[zipfile.ZipInfo, str]], int]:
+        """Walk the archive directory once, returning supported entries and total size."""
+        entries = []
+        total_size = 0
+        
+        for file_info in zip_ref.infolist():
+            total_size += file_info.file_size
+            if file_info.is_dir():
+                continue
+            
+            file_ext = Path(file_info.filename).suffix.lower()
+            if file_ext in self.supported_extensions:
+                entries.append((file_info, file_ext))
+        
+        return entries, total_size
+    
+    def _parse_members_in_parallel(
+        self,
+        zip_path: str,
+        entries: List[Tuple[zipfile.ZipInfo, str]]
+    ) -> List[Optional[NotebookFile]]:
+        """Decompress and parse ZIP members on the pool, in archive order.
+        
+        A ZipFile shares one file handle and is not safe to read from several
+        threads, so each worker opens its own handle; decompression (zlib releases
+        the GIL) and decoding then overlap, and only members in flight are held
+        in memory.
+        """
+        local = threading.local()
+        handles = []
+        handles_lock = threading.Lock()
+        
+        def parse_entry(entry):
+            zip_ref = getattr(local, 'zip_ref', None)
+            if zip_ref is None:
+                zip_ref = local.zip_ref = zipfile.ZipFile(zip_path, 'r')
+                with handles_lock:
+                    handles.append(zip_ref)
+            return self._parse_member(zip_ref, *entry)
+        
+        try:
+            return list(self._parse_pool.map(parse_entry, entries))
+        finally:
+            for zip_ref in handles:
+                zip_ref.close()
+    
+    def _parse_member(
+        self,
+        zip_ref: zipfile.ZipFile,
+        file_info: zipfile.ZipInfo,
+        file_ext: str
+    ) -> Optional[NotebookFile]:
+        """Read and parse one ZIP member, logging instead of raising so other members still load."""
+        try:
+            data = zip_ref.read(file_info)
+            return self._parse_content(data, file_info.filename, file_ext)
+        except Exception as e:
+            logger.error(f"Failed to parse {file_info.filename}: {e}")
+            return None
+    
+    def _parse_content(self, data: bytes, filename: str, file_ext: str) -> Optional[NotebookFile]:
+        """Parse in-memory file content (e.g. a ZIP member) by extension."""
+        if file_ext == '.ipynb':
+            return self._parse_notebook_content(data, filename, len(data))
+        
+        language, kind = self.source_languages[file_ext]
+        return self._parse_source_content(data.decode('utf-8'), filename, len(data), language, kind)
+    
     def _parse_notebook(self, file_path: str, filename: str) -> Optional[NotebookFile]:
         """Parse a Jupyter notebook file."""
         try:
-            # Load notebook
-            notebook = nbformat.read(file_path, as_version=4)
+            with open(file_path, 'rb') as f:
+                content = f.read()
+        except Exception as e:
+            logger.error(f"Failed to parse notebook {filename}: {e}")
+            return None
+        
+        return self._parse_notebook_content(content, filename, len(content))
+    
+    def _parse_notebook_content(self, content: bytes, filename: str, file_size: int) -> Optional[NotebookFile]:
+        """Parse Jupyter notebook JSON content."""
+        try:
+            # v4 notebooks are read as plain dicts (only code sources are needed, so skip
+            # nbformat's node graph); older formats are upgraded through nbformat
+            notebook = orjson.loads(content)
+            if notebook.get('nbformat') != 4:
+                notebook = nbformat.convert(nbformat.from_dict(notebook), 4)
+            
+            # One timestamp for the whole notebook instead of two per cell
+            parsed_at = datetime.utcnow()
             
             cells = []
-            for i, cell in enumerate(notebook.cells):
-                if cell.cell_type == 'code':
-                    code_cell = self._extract_code_cell(cell, i)
+            for i, cell in enumerate(notebook.get('cells', [])):
+                if cell.get('cell_type') == 'code':
+                    code_cell = self._extract_code_cell(cell, i, parsed_at)
                     if code_cell:
                         cells.append(code_cell)
             
@@ -108,24 +200,31 @@ class NotebookParser:
                 logger.warning(f"No code cells found in {filename}")
                 return None
             
-            # Get file size
-            file_size = os.path.getsize(file_path)
-            
             return NotebookFile(
                 filename=filename,
                 file_size=file_size,
                 cell_count=len(cells),
-                cells=cells
+                cells=cells,
+                created_at=parsed_at,
+                updated_at=parsed_at
             )
             
         except Exception as e:
             logger.error(f"Failed to parse notebook {filename}: {e}")
             return None
     
-    def _extract_code_cell(self, cell: NotebookNode, index: int) -> Optional[CodeCell]:
+    def _extract_code_cell(
+        self,
+        cell: Dict,
+        index: int,
+        parsed_at: Optional[datetime] = None
+    ) -> Optional[CodeCell]:
         """Extract code cell from notebook cell."""
         try:
-            source = cell.source
+            # ipynb stores multi-line sources as a list of lines
+            source = cell.get('source')
+            if isinstance(source, list):
+                source = ''.join(source)
             if not source or not source.strip():
                 return None
             
@@ -136,14 +235,19 @@ class NotebookParser:
             line_count = len(source.splitlines())
             
             # Get execution count if available
-            execution_count = getattr(cell, 'execution_count', None)
+            execution_count = cell.get('execution_count')
+            
+            if parsed_at is None:
+                parsed_at = datetime.utcnow()
             
             return CodeCell(
                 cell_id=f"cell_{index}",
                 language=language,
                 code=source.strip(),
                 line_count=line_count,
-                execution_count=execution_count
+                execution_count=execution_count,
+                created_at=parsed_at,
+                updated_at=parsed_at
             )
             
         except Exception as e:
@@ -152,16 +256,12 @@ class NotebookParser:
     
     def _detect_language(self, code: str) -> LanguageType:
         """Detect programming language from code content."""
-        code_lower = code.lower()
-        
         # SQL detection
-        sql_keywords = ['select', 'from', 'where', 'insert', 'update', 'delete', 'create', 'drop', 'alter']
-        if any(keyword in code_lower for keyword in sql_keywords):
+        if _SQL_KEYWORD_RE.search(code):
             return LanguageType.SQL
         
         # PySpark detection
-        pyspark_keywords = ['spark', 'spark.sql', 'dataframe', 'rdd', 'pyspark']
-        if any(keyword in code_lower for keyword in pyspark_keywords):
+        if _PYSPARK_KEYWORD_RE.search(code):
             return LanguageType.PYSPARK
         
         # Python detection (default for notebooks)
@@ -169,118 +269,68 @@ class NotebookParser:
     
     def _parse_python_file(self, file_path: str, filename: str) -> Optional[NotebookFile]:
         """Parse a Python file as a single code cell."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                code = f.read()
-            
-            if not code.strip():
-                return None
-            
-            cell = CodeCell(
-                cell_id="main",
-                language=LanguageType.PYTHON,
-                code=code.strip(),
-                line_count=len(code.splitlines())
-            )
-            
-            file_size = os.path.getsize(file_path)
-            
-            return NotebookFile(
-                filename=filename,
-                file_size=file_size,
-                cell_count=1,
-                cells=[cell]
-            )
-            
-        except Exception as e:
-            logger.error(f"Failed to parse Python file {filename}: {e}")
-            return None
+        return self._parse_source_file(file_path, filename, '.py')
     
     def _parse_sql_file(self, file_path: str, filename: str) -> Optional[NotebookFile]:
         """Parse a SQL file as a single code cell."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                code = f.read()
-            
-            if not code.strip():
-                return None
-            
-            cell = CodeCell(
-                cell_id="main",
-                language=LanguageType.SQL,
-                code=code.strip(),
-                line_count=len(code.splitlines())
-            )
-            
-            file_size = os.path.getsize(file_path)
-            
-            return NotebookFile(
-                filename=filename,
-                file_size=file_size,
-                cell_count=1,
-                cells=[cell]
-            )
-            
-        except Exception as e:
-            logger.error(f"Failed to parse SQL file {filename}: {e}")
-            return None
+        return self._parse_source_file(file_path, filename, '.sql')
     
     def _parse_scala_file(self, file_path: str, filename: str) -> Optional[NotebookFile]:
         """Parse a Scala file (for Spark) as a single code cell."""
+        return self._parse_source_file(file_path, filename, '.scala')
+    
+    def _parse_r_file(self, file_path: str, filename: str) -> Optional[NotebookFile]:
+        """Parse an R file as a single code cell."""
+        return self._parse_source_file(file_path, filename, '.r')
+    
+    def _parse_source_file(self, file_path: str, filename: str, file_ext: str) -> Optional[NotebookFile]:
+        """Read a source file from disk and parse it as a single code cell."""
+        language, kind = self.source_languages[file_ext]
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                code = f.read()
-            
-            if not code.strip():
-                return None
-            
-            cell = CodeCell(
-                cell_id="main",
-                language=LanguageType.PYSPARK,  # Treat as PySpark for evaluation
-                code=code.strip(),
-                line_count=len(code.splitlines())
-            )
-            
-            file_size = os.path.getsize(file_path)
-            
-            return NotebookFile(
-                filename=filename,
-                file_size=file_size,
-                cell_count=1,
-                cells=[cell]
-            )
-            
+            # Read raw bytes in one call and decode once; the byte length is the file size
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            code = data.decode('utf-8')
         except Exception as e:
-            logger.error(f"Failed to parse Scala file {filename}: {e}")
+            logger.error(f"Failed to parse {kind} file {filename}: {e}")
             return None
+        
+        return self._parse_source_content(code, filename, len(data), language, kind)
     
-    def _parse_r_file(self, file_path: str, filename: str) -> Optional[NotebookFile]:
-        """Parse an R file as a single code cell."""
+    def _parse_source_content(
+        self,
+        code: str,
+        filename: str,
+        file_size: int,
+        language: LanguageType,
+        kind: str
+    ) -> Optional[NotebookFile]:
+        """Build a single-cell NotebookFile from source code."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                code = f.read()
-            
             if not code.strip():
                 return None
             
+            parsed_at = datetime.utcnow()
             cell = CodeCell(
                 cell_id="main",
-                language=LanguageType.PYTHON,  # Treat as Python for evaluation
+                language=language,
                 code=code.strip(),
-                line_count=len(code.splitlines())
+                line_count=len(code.splitlines()),
+                created_at=parsed_at,
+                updated_at=parsed_at
             )
             
-            file_size = os.path.getsize(file_path)
-            
             return NotebookFile(
                 filename=filename,
                 file_size=file_size,
                 cell_count=1,
-                cells=[cell]
+                cells=[cell],
+                created_at=parsed_at,
+                updated_at=parsed_at
             )
             
         except Exception as e:
-            logger.error(f"Failed to parse R file {filename}: {e}")
+            logger.error(f"Failed to parse {kind} file {filename}: {e}")
             return None
     
     def validate_file(self, file_path: str) -> bool:
@@ -348,22 +398,26 @@ class NotebookParser:
     
     def get_file_statistics(self, notebook_files: List[NotebookFile]) -> Dict:
         """Get statistics about parsed files."""
+        total_cells = 0
+        total_size = 0
+        languages = Counter()
+        
+        # Count cells, sizes and languages in a single walk
+        for notebook_file in notebook_files:
+            total_cells += len(notebook_file.cells)
+            total_size += notebook_file.file_size
+            languages.update(cell.language.value for cell in notebook_file.cells)
+        
         stats = {
             'total_files': len(notebook_files),
-            'total_cells': sum(len(f.cells) for f in notebook_files),
-            'languages': {},
-            'total_size': sum(f.file_size for f in notebook_files),
+            'total_cells': total_cells,
+            'languages': dict(languages),
+            'total_size': total_size,
             'average_cells_per_file': 0
         }
         
         if notebook_files:
-            stats['average_cells_per_file'] = stats['total_cells'] / stats['total_files']
-        
-        # Count languages
-        for notebook_file in notebook_files:
-            for cell in notebook_file.cells:
-                lang = cell.language.value
-                stats['languages'][lang] = stats['languages'].get(lang, 0) + 1
+            stats['average_cells_per_file'] = total_cells / stats['total_files']
         
         return stats
 
@@ -15,14 +15,108 @@ import logging
 import subprocess
 import tempfile
 import os
+import threading
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 import numpy as np
+import re2
 from app.models import ScoreBreakdown, ModelFeedback
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+
+def _compile_linear(pattern: str):
+    """Compile a case-insensitive pattern with RE2.
+    
+    RE2 matches in linear time, which keeps the ``.*``-heavy checks below
+    safe on large scripts. A pattern using a construct RE2 does not support
+    falls back to ``re`` with a warning, since it loses that guarantee.
+    """
+    try:
+        options = re2.Options()
+        options.case_sensitive = False
+        return re2.compile(pattern, options)
+    except re2.error as e:
+        logger.warning(f"RE2 cannot compile {pattern!r} ({e}); using backtracking re")
+        return re.compile(pattern, re.IGNORECASE)
+
+
+# SQL Injection patterns (comprehensive)
+_SQL_INJECTION_SOURCES = (
+    r"OR\s+['\"]?1['\"]?\s*=\s*['\"]?1['\"]?",  # OR 1=1
+    r"OR\s+['\"]?true['\"]?\s*=\s*['\"]?true['\"]?",  # OR true=true
+    r"OR\s+['\"]?yes['\"]?\s*=\s*['\"]?yes['\"]?",  # OR yes=yes
+    r"OR\s+['\"]?1['\"]?\s*=\s*['\"]?1['\"]?\s*--",  # OR 1=1--
+    r"OR\s+['\"]?1['\"]?\s*=\s*['\"]?1['\"]?\s*#",  # OR 1=1#
+    r"OR\s+['\"]?1['\"]?\s*=\s*['\"]?1['\"]?\s*/\*",  # OR 1=1/*
+    r"UNION\s+SELECT",  # UNION SELECT
+    r"UNION\s+ALL\s+SELECT",  # UNION ALL SELECT
+    r"';?\s*DROP\s+TABLE",  # '; DROP TABLE
+    r"';?\s*DELETE\s+FROM",  # '; DELETE FROM
+    r"';?\s*UPDATE\s+",  # '; UPDATE
+    r"';?\s*INSERT\s+INTO",  # '; INSERT INTO
+    r"';?\s*ALTER\s+TABLE",  # '; ALTER TABLE
+    r"';?\s*CREATE\s+TABLE",  # '; CREATE TABLE
+    r"';?\s*EXEC\s+",  # '; EXEC
+    r"';?\s*EXECUTE\s+",  # '; EXECUTE
+    r"';?\s*xp_cmdshell",  # '; xp_cmdshell
+    r"';?\s*sp_executesql",  # '; sp_executesql
+)
+SQL_INJECTION_PATTERNS = [re.compile(p, re.IGNORECASE) for p in _SQL_INJECTION_SOURCES]
+
+# Destructive operations
+_DESTRUCTIVE_SOURCES = (
+    r"DELETE\s+FROM\s+\w+(?:\s+WHERE\s+[\w\s=<>()'\"`]+)?\s*;?\s*$",  # DELETE without WHERE
+    r"UPDATE\s+\w+\s+SET\s+[\w\s=,]+(?:\s+WHERE\s+[\w\s=<>()'\"`]+)?\s*;?\s*$",  # UPDATE without WHERE
+    r"DROP\s+(?:TABLE|DATABASE|INDEX|VIEW)\s+",  # DROP operations
+    r"TRUNCATE\s+TABLE\s+",  # TRUNCATE
+    r"ALTER\s+TABLE\s+.{0,400}?\s+DROP\s+",  # ALTER DROP
+)
+DESTRUCTIVE_PATTERNS = [_compile_linear(p) for p in _DESTRUCTIVE_SOURCES]
+
+# Performance anti-patterns; the clause checks in the efficiency evaluator
+# use the same compiled objects, so the two cannot drift apart
+_ORDER_BY_RE = re.compile(r"ORDER\s+BY\s+.{0,400}?\s+(?:ASC|DESC)?\s*(?!LIMIT)", re.IGNORECASE)  # ORDER BY without LIMIT
+_GROUP_HAVING_ORDER_RE = re.compile(
+    r"GROUP\s+BY\s+.{0,400}?\s+HAVING\s+.{0,400}?\s+ORDER\s+BY", re.IGNORECASE
+)  # Complex grouping without limit
+PERFORMANCE_ANTI_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"SELECT\s+\*",  # SELECT *
+    r"CROSS\s+JOIN",  # CROSS JOIN
+    r"FULL\s+OUTER\s+JOIN",  # FULL OUTER JOIN (often unnecessary)
+)] + [_ORDER_BY_RE, _GROUP_HAVING_ORDER_RE]
+
+# Common SQL errors
+SQL_ERROR_PATTERNS = [_compile_linear(p) for p in (
+    r"SELECT\s+.{0,400}?\s+FROM\s+\w+s{2,}",  # Double 's' in table name (common typo)
+    r"WHERE\s+.{0,400}?\s+=\s+['\"][^'\"]*['\"]\s*$",  # String comparison without proper escaping
+    r"JOIN\s+\w+\s+ON\s+.{0,400}?\s+=\s+.{0,400}?\s+AND\s+.{0,400}?\s+OR\s+",  # Complex JOIN with OR (often wrong)
+)]
+
+# Each family fused into one alternation so clean SQL is swept once per
+# family; the individual patterns are only consulted to report which one hit.
+_SQL_INJECTION_ANY_RE = re.compile('|'.join(f'(?:{p})' for p in _SQL_INJECTION_SOURCES), re.IGNORECASE)
+_DESTRUCTIVE_ANY_RE = _compile_linear('|'.join(f'(?:{p})' for p in _DESTRUCTIVE_SOURCES))
+
+# Single-purpose checks used by the task evaluators
+_LINE_COMMENT_RE = re.compile(r'--.*$', re.MULTILINE)
+_BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+_WHITESPACE_RE = re.compile(r'\s+')
+_SELECT_STAR_RE = re.compile(r'SELECT\s+\*', re.IGNORECASE)
+_GRANT_ADMIN_RE = _compile_linear(r'GRANT\s+.{0,400}?\s+TO\s+.{0,400}?\s+WITH\s+ADMIN\s+OPTION')
+_SELECT_RE = re.compile(r'SELECT\s+', re.IGNORECASE)
+_DML_TARGET_RE = re.compile(r'(DELETE|UPDATE)\s+FROM?\s+\w+', re.IGNORECASE)
+_WHERE_RE = re.compile(r'WHERE\s+', re.IGNORECASE)
+_TABLE_TYPO_RE = re.compile(r'FROM\s+\w+s{2,}', re.IGNORECASE)
+_CROSS_JOIN_RE = re.compile(r'CROSS\s+JOIN', re.IGNORECASE)
+_HAVING_RE = re.compile(r'HAVING', re.IGNORECASE)
+_SELECT_ANY_CASE_RE = re.compile(r'select|SELECT')
+_SELECT_TITLE_CASE_RE = re.compile(r'Select')
+_OPERATOR_SPACING_RE = re.compile(r'\s+[=<>!]+\s+')
+_SHORT_ALIAS_RE = re.compile(r'AS\s+[a-z]', re.IGNORECASE)
+
+
+@dataclass(slots=True)
 class SQLSecurityAnalysis:
     """Security analysis results for SQL."""
     has_sql_injection: bool
@@ -32,7 +126,7 @@ class SQLSecurityAnalysis:
     security_score: float
     security_issues: List[str]
 
-@dataclass
+@dataclass(slots=True)
 class SQLCorrectnessAnalysis:
     """Correctness analysis results for SQL."""
     syntax_valid: bool
@@ -42,7 +136,7 @@ class SQLCorrectnessAnalysis:
     correctness_score: float
     correctness_issues: List[str]
 
-@dataclass
+@dataclass(slots=True)
 class SQLEfficiencyAnalysis:
     """Efficiency analysis results for SQL."""
     uses_select_star: bool
@@ -57,52 +151,15 @@ class SQLSpecializedEvaluator:
     
     def __init__(self):
         """Initialize SQL specialized evaluator."""
-        # SQL Injection patterns (comprehensive)
-        self.sql_injection_patterns = [
-            r"OR\s+['\"]?1['\"]?\s*=\s*['\"]?1['\"]?",  # OR 1=1
-            r"OR\s+['\"]?true['\"]?\s*=\s*['\"]?true['\"]?",  # OR true=true
-            r"OR\s+['\"]?yes['\"]?\s*=\s*['\"]?yes['\"]?",  # OR yes=yes
-            r"OR\s+['\"]?1['\"]?\s*=\s*['\"]?1['\"]?\s*--",  # OR 1=1--
-            r"OR\s+['\"]?1['\"]?\s*=\s*['\"]?1['\"]?\s*#",  # OR 1=1#
-            r"OR\s+['\"]?1['\"]?\s*=\s*['\"]?1['\"]?\s*/\*",  # OR 1=1/*
-            r"UNION\s+SELECT",  # UNION SELECT
-            r"UNION\s+ALL\s+SELECT",  # UNION ALL SELECT
-            r"';?\s*DROP\s+TABLE",  # '; DROP TABLE
-            r"';?\s*DELETE\s+FROM",  # '; DELETE FROM
-            r"';?\s*UPDATE\s+",  # '; UPDATE
-            r"';?\s*INSERT\s+INTO",  # '; INSERT INTO
-            r"';?\s*ALTER\s+TABLE",  # '; ALTER TABLE
-            r"';?\s*CREATE\s+TABLE",  # '; CREATE TABLE
-            r"';?\s*EXEC\s+",  # '; EXEC
-            r"';?\s*EXECUTE\s+",  # '; EXECUTE
-            r"';?\s*xp_cmdshell",  # '; xp_cmdshell
-            r"';?\s*sp_executesql",  # '; sp_executesql
-        ]
-        
-        # Destructive operations
-        self.destructive_patterns = [
-            r"DELETE\s+FROM\s+\w+(?:\s+WHERE\s+[\w\s=<>()'\"`]+)?\s*;?\s*$",  # DELETE without WHERE
-            r"UPDATE\s+\w+\s+SET\s+[\w\s=,]+(?:\s+WHERE\s+[\w\s=<>()'\"`]+)?\s*;?\s*$",  # UPDATE without WHERE
-            r"DROP\s+(?:TABLE|DATABASE|INDEX|VIEW)\s+",  # DROP operations
-            r"TRUNCATE\s+TABLE\s+",  # TRUNCATE
-            r"ALTER\s+TABLE\s+.*\s+DROP\s+",  # ALTER DROP
-        ]
-        
-        # Performance anti-patterns
-        self.performance_anti_patterns = [
-            r"SELECT\s+\*",  # SELECT *
-            r"CROSS\s+JOIN",  # CROSS JOIN
-            r"FULL\s+OUTER\s+JOIN",  # FULL OUTER JOIN (often unnecessary)
-            r"ORDER\s+BY\s+.*\s+(?:ASC|DESC)?\s*(?!LIMIT)",  # ORDER BY without LIMIT
-            r"GROUP\s+BY\s+.*\s+HAVING\s+.*\s+ORDER\s+BY",  # Complex grouping without limit
-        ]
-        
-        # Common SQL errors
-        self.sql_error_patterns = [
-            r"SELECT\s+.*\s+FROM\s+\w+s{2,}",  # Double 's' in table name (common typo)
-            r"WHERE\s+.*\s+=\s+['\"][^'\"]*['\"]\s*$",  # String comparison without proper escaping
-            r"JOIN\s+\w+\s+ON\s+.*\s+=\s+.*\s+AND\s+.*\s+OR\s+",  # Complex JOIN with OR (often wrong)
-        ]
+        # Pattern tables are compiled once at module level
+        self.sql_injection_patterns = SQL_INJECTION_PATTERNS
+        self.destructive_patterns = DESTRUCTIVE_PATTERNS
+        self.performance_anti_patterns = PERFORMANCE_ANTI_PATTERNS
+        self.sql_error_patterns = SQL_ERROR_PATTERNS
+        
+        # CodeBERT evaluator is created on first model-based scoring and reused
+        self._codebert_evaluator = None
+        self._codebert_evaluator_lock = threading.Lock()
         
         logger.info("SQL Specialized Evaluator initialized with comprehensive patterns")
     
@@ -139,11 +196,11 @@ class SQLSpecializedEvaluator:
     def _normalize_sql(self, code: str) -> str:
         """Normalize SQL code for analysis."""
         # Remove comments
-        code = re.sub(r'--.*$', '', code, flags=re.MULTILINE)
-        code = re.sub(r'/\*.*?\*/', '', code, flags=re.DOTALL)
+        code = _LINE_COMMENT_RE.sub('', code)
+        code = _BLOCK_COMMENT_RE.sub('', code)
         
         # Normalize whitespace
-        code = re.sub(r'\s+', ' ', code)
+        code = _WHITESPACE_RE.sub(' ', code)
         code = code.strip()
         
         return code
@@ -157,26 +214,25 @@ class SQLSpecializedEvaluator:
         has_destructive_operations = False
         
         # Check for SQL injection patterns
-        for pattern in self.sql_injection_patterns:
-            if re.search(pattern, sql, re.IGNORECASE):
-                has_sql_injection = True
-                issues.append(f"SQL injection vulnerability detected: {pattern}")
-                break
+        if _SQL_INJECTION_ANY_RE.search(sql):
+            pattern = next(p for p in self.sql_injection_patterns if p.search(sql))
+            has_sql_injection = True
+            issues.append(f"SQL injection vulnerability detected: {pattern.pattern}")
         
         # Check for destructive operations
-        for pattern in self.destructive_patterns:
-            if re.search(pattern, sql, re.IGNORECASE):
-                has_destructive_operations = True
-                issues.append(f"Destructive operation detected: {pattern}")
-                break
+        if _DESTRUCTIVE_ANY_RE.search(sql):
+            pattern = next(p for p in self.destructive_patterns if p.search(sql))
+            has_destructive_operations = True
+            issues.append(f"Destructive operation detected: {pattern.pattern}")
         
         # Check for data exposure
-        if re.search(r'SELECT\s+\*', sql, re.IGNORECASE):
+        if _SELECT_STAR_RE.search(sql):
             has_data_exposure = True
             issues.append("SELECT * can expose sensitive data")
         
-        # Check for privilege escalation attempts
-        if re.search(r'GRANT\s+.*\s+TO\s+.*\s+WITH\s+ADMIN\s+OPTION', sql, re.IGNORECASE):
+        # Check for privilege escalation attempts (RE2, linear time; the pattern
+        # starts with its keyword, so cells without GRANT fail fast)
+        if _GRANT_ADMIN_RE.search(sql):
             has_privilege_escalation = True
             issues.append("Privilege escalation attempt detected")
         
@@ -209,7 +265,7 @@ class SQLSpecializedEvaluator:
         column_exists = True  # Assume true for analysis
         
         # Check for basic syntax errors
-        if not re.search(r'SELECT\s+', sql, re.IGNORECASE):
+        if not _SELECT_RE.search(sql):
             syntax_valid = False
             issues.append("Missing SELECT statement")
         
@@ -222,17 +278,17 @@ class SQLSpecializedEvaluator:
         
         # Check for common SQL errors
         for pattern in self.sql_error_patterns:
-            if re.search(pattern, sql, re.IGNORECASE):
+            if pattern.search(sql):
                 logic_valid = False
-                issues.append(f"Logic error detected: {pattern}")
+                issues.append(f"Logic error detected: {pattern.pattern}")
         
         # Check for missing WHERE clause in DELETE/UPDATE
-        if re.search(r'(DELETE|UPDATE)\s+FROM?\s+\w+', sql, re.IGNORECASE) and not re.search(r'WHERE\s+', sql, re.IGNORECASE):
+        if _DML_TARGET_RE.search(sql) and not _WHERE_RE.search(sql):
             logic_valid = False
             issues.append("DELETE/UPDATE without WHERE clause - will affect ALL rows")
         
         # Check for table name typos (common error)
-        if re.search(r'FROM\s+\w+s{2,}', sql, re.IGNORECASE):
+        if _TABLE_TYPO_RE.search(sql):
             logic_valid = False
             issues.append("Possible table name typo (double 's')")
         
@@ -261,21 +317,23 @@ class SQLSpecializedEvaluator:
         has_cartesian_products = False
         
         # Check for SELECT *
-        if re.search(r'SELECT\s+\*', sql, re.IGNORECASE):
+        if _SELECT_STAR_RE.search(sql):
             uses_select_star = True
             issues.append("SELECT * is inefficient - select only needed columns")
         
         # Check for CROSS JOIN
-        if re.search(r'CROSS\s+JOIN', sql, re.IGNORECASE):
+        if _CROSS_JOIN_RE.search(sql):
             has_cartesian_products = True
             issues.append("CROSS JOIN can be very expensive")
         
-        # Check for ORDER BY without LIMIT
-        if re.search(r'ORDER\s+BY\s+.*\s+(?:ASC|DESC)?\s*(?!LIMIT)', sql, re.IGNORECASE):
+        # Check for ORDER BY without LIMIT (the pattern starts with its keyword,
+        # so cells without ORDER BY fail fast)
+        if _ORDER_BY_RE.search(sql):
             issues.append("ORDER BY without LIMIT can be slow on large datasets")
         
-        # Check for complex GROUP BY without limit
-        if re.search(r'GROUP\s+BY\s+.*\s+HAVING\s+.*\s+ORDER\s+BY', sql, re.IGNORECASE):
+        # Check for complex GROUP BY without limit; a HAVING prescan skips the
+        # bounded GROUP BY scan for the many cells without one
+        if _HAVING_RE.search(sql) and _GROUP_HAVING_ORDER_RE.search(sql):
             issues.append("Complex GROUP BY with HAVING and ORDER BY can be slow")
         
         # Calculate efficiency score
@@ -302,22 +360,22 @@ class SQLSpecializedEvaluator:
         score = 10.0
         
         # Check for consistent case
-        if re.search(r'select|SELECT', sql) and re.search(r'Select', sql):
+        if _SELECT_ANY_CASE_RE.search(sql) and _SELECT_TITLE_CASE_RE.search(sql):
             issues.append("Inconsistent SQL case usage")
             score -= 2.0
         
         # Check for proper spacing around operators
-        if not re.search(r'\s+[=<>!]+\s+', sql):
+        if not _OPERATOR_SPACING_RE.search(sql):
             issues.append("Missing spaces around operators")
             score -= 1.0
         
         # Check for meaningful column aliases
-        if re.search(r'AS\s+[a-z]', sql, re.IGNORECASE):
+        if _SHORT_ALIAS_RE.search(sql):
             issues.append("Use meaningful column aliases")
             score -= 1.0
         
         # Check for proper indentation (basic check)
-        if len(sql.split()) > 10 and not re.search(r'\n', sql):
+        if len(sql.split()) > 10 and '\n' not in sql:
             issues.append("Consider proper SQL formatting with line breaks")
             score -= 1.0
         
@@ -444,10 +502,11 @@ class SQLSpecializedEvaluator:
         except Exception:
             return {'correctness': 2.0, 'efficiency': 2.0, 'best_practices': 2.0, 'readability': 2.0, 'security': 2.0}
         correctness = 10.0 if parsed else 2.0
+        code_lower = code.lower()
         efficiency = 10.0
-        if 'select *' in code.lower():
+        if 'select *' in code_lower:
             efficiency -= 3.0
-        if any(cmd in code.lower() for cmd in ['delete', 'update']) and 'where' not in code.lower():
+        if any(cmd in code_lower for cmd in ['delete', 'update']) and 'where' not in code_lower:
             efficiency -= 5.0
         best_practices = 10.0
         if not all([t.isidentifier() for t in parsed.find_all(sqlglot.exp.Table)]):
@@ -455,7 +514,7 @@ class SQLSpecializedEvaluator:
         formatted = sqlparse.format(code, reindent=True, keyword_case='upper')
         readability = 10.0 if formatted.count('\n') > 1 else 6.0
         security = 10.0
-        if 'or 1=1' in code.lower() or 'or true' in code.lower():
+        if 'or 1=1' in code_lower or 'or true' in code_lower:
             security -= 8.0
         return {
             'correctness': correctness,
@@ -477,7 +536,11 @@ class SQLSpecializedEvaluator:
         }
     def _evaluate_with_codebert(self, code: str):
         # Use the existing CodeBERTEvaluator for model-based scoring
-        from app.services.codebert_evaluator import CodeBERTEvaluator
-        evaluator = CodeBERTEvaluator()
-        feedback = evaluator.evaluate_code(code, 'sql')
+        if self._codebert_evaluator is None:
+            # Runs in worker threads; only one of them loads the model
+            with self._codebert_evaluator_lock:
+                if self._codebert_evaluator is None:
+                    from app.services.codebert_evaluator import CodeBERTEvaluator
+                    self._codebert_evaluator = CodeBERTEvaluator()
+        feedback = self._codebert_evaluator.evaluate_code(code, 'sql')
         return feedback.scores 
\ No newline at end of file
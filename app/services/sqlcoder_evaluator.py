@@ -38,13 +38,15 @@ class ModelCache:
         return cls._instance
     
     def __init__(self):
-        if self._initialized:
-            return
-        self._initialized = True
-        self._models = {}
-        self._model_locks = {}
-        self._evaluation_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
-        self._load_optimized_models()
+        # Check and set under the class lock so concurrent first calls load the models once
+        with self._lock:
+            if self._initialized:
+                return
+            self._models = {}
+            self._model_locks = {}
+            self._evaluation_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+            self._load_optimized_models()
+            self._initialized = True
     
     def _load_optimized_models(self):
         """Load optimized SQL-specific models."""
@@ -98,24 +100,31 @@ class SQLCoderEvaluator:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
                     cls._instance.logger = logging.getLogger(__name__)
+                    cls._instance._initialized = False
         return cls._instance
     
     def __init__(self):
-        self.logger = logging.getLogger(__name__)
-        # Do not re-init here
-        
-        # Initialize sqlfluff for enhanced static analysis
-        self._init_sqlfluff()
-        
-        # Optimized scoring weights for SQL-specific models
-        self.weights = {
-            'correctness': 0.30,    # StarCoder2 - most important for SQL
-            'readability': 0.20,    # CodeT5+ - code understanding
-            'security': 0.25,       # SecurityBERT - critical for SQL
-            'sql_scoring': 0.25     # SQLCoder - SQL-specific analysis
-        }
-        
-        self.logger.info("SQLCoder Evaluator with optimized SQL-specific models initialized successfully")
+        # __init__ runs on every SQLCoderEvaluator() call; only the first one probes
+        # sqlfluff and sets up the shared instance. The check and set share the class
+        # lock, since evaluations run in worker threads
+        with self._lock:
+            if self._initialized:
+                return
+            self.logger = logging.getLogger(__name__)
+            
+            # Initialize sqlfluff for enhanced static analysis
+            self._init_sqlfluff()
+            
+            # Optimized scoring weights for SQL-specific models
+            self.weights = {
+                'correctness': 0.30,    # StarCoder2 - most important for SQL
+                'readability': 0.20,    # CodeT5+ - code understanding
+                'security': 0.25,       # SecurityBERT - critical for SQL
+                'sql_scoring': 0.25     # SQLCoder - SQL-specific analysis
+            }
+            
+            self.logger.info("SQLCoder Evaluator with optimized SQL-specific models initialized successfully")
+            self._initialized = True
     
     def _init_sqlfluff(self):
         """Initialize SQLFluff for static analysis."""
@@ -129,6 +138,10 @@ class SQLCoderEvaluator:
             self.logger.warning(f"SQLFluff not available: {e}")
     
     async def evaluate(self, cell: CodeCell) -> ModelFeedback:
+        """Evaluate SQL code without blocking the event loop."""
+        return await asyncio.to_thread(self.evaluate_sync, cell)
+    
+    def evaluate_sync(self, cell: CodeCell) -> ModelFeedback:
         """Evaluate SQL code using single best model (CodeBERT)."""
         try:
             # Extract SQL code from cell
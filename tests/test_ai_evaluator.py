@@ -0,0 +1,56 @@
+"""Tests for AI evaluator response parsing."""
+
+import orjson
+import pytest
+
+from app.models import SCORE_CRITERIA
+from app.services.ai_evaluator import AIEvaluator, _JsonObjectStream
+
+
+@pytest.fixture
+def evaluator():
+    # Parsing needs no clients, caches or prompts, so skip __init__
+    return AIEvaluator.__new__(AIEvaluator)
+
+
+def _scores_json(criteria=SCORE_CRITERIA, score=8):
+    return orjson.dumps({criterion: score for criterion in criteria}).decode()
+
+
+def test_reply_truncated_inside_feedback_keeps_scores(evaluator):
+    content = '{"scores": ' + _scores_json() + ', "feedback": "Good structure, but the loop re'
+    
+    feedback = evaluator._parse_ai_response(content, "OpenAI GPT-4")
+    
+    assert feedback.scores.correctness == 8.0
+    assert feedback.scores.error_handling == 8.0
+    assert feedback.feedback.startswith("Good structure, but the loop")
+    assert feedback.confidence > 0
+
+
+def test_reply_truncated_inside_scores_is_not_padded(evaluator):
+    content = '{"scores": ' + _scores_json(SCORE_CRITERIA[:3])[:-1] + ', "modula'
+    
+    feedback = evaluator._parse_ai_response(content, "OpenAI GPT-4")
+    
+    assert feedback.confidence < 0.5
+    assert feedback.scores.correctness != 8.0
+
+
+def test_stream_does_not_stop_after_first_array_element():
+    reply = '[{"cell": 1, "scores": {"correctness": 8}}, {"cell": 2, "scores": {"correctness": 6}}]'
+    stream = _JsonObjectStream()
+    
+    # Feed in small chunks, as a provider stream would
+    done = [stream.feed(reply[i:i + 7]) for i in range(0, len(reply), 7)]
+    
+    assert done[-1] is True
+    assert not any(done[:-1])
+    assert stream.text == reply
+
+
+def test_stream_stops_when_object_closes():
+    stream = _JsonObjectStream()
+    
+    assert stream.feed('Here is the evaluation: {"scores": {"correctness": 8}, ') is False
+    assert stream.feed('"feedback": "ok"}') is True